@@ -3,6 +3,9 @@ WIFI_PASSWORD = ""
 HOSTNAME = "solar"
 WIFI_COUNTRY = ""
 REFRESH_WEBPAGE = 10
+HTTP_PORT = 80
+CLIENT_RENDERING = False
+COMPRESS_RESPONSES = False
 
 DEVICE_MAC = ""
 DEVICE_ID = ""
@@ -12,3 +15,7 @@ METER_POWER_FIELD = "activePowerMin"
 METER_POWER_DISPLAY_FIELD = "activePowerAvg"
 POWER_LOWER_LIMIT = 0
 POWER_UPPER_LIMIT = 100
+CONTROL_PERIOD = 60  # seconds
+CONTROL_PERIOD_MIN = 60  # seconds, shorter to poll faster when the load changes
+
+SIMULATION = False
@@ -19,3 +19,7 @@ def get_translation(request):
         if t:
             return t
     return __base_t
+
+
+def get_translations():
+    return __translations.values()
@@ -29,6 +29,7 @@ class BaseTranslation:
         "Hub": None,
         "inactive": None,
         "Inverter manufacturer": None,
+        "Load volatility": None,
         "Maximum charge level": None,
         "Maximum inverter power": None,
         "Maximum power": None,
@@ -42,6 +43,7 @@ class BaseTranslation:
         "Output": None,
         "Pack\u00a0{}": None,
         "Panel\u00a0{}": None,
+        "Polling interval": None,
         "Power": None,
         "Power import": None,
         "Remaining at limit": None,
@@ -51,6 +53,7 @@ class BaseTranslation:
         "Settings": None,
         "Software version": None,
         "Solar": None,
+        "Stale data from {} ago": None,
         "State of health": None,
         "Target range": None,
         "Total power": None,
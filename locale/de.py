@@ -28,6 +28,7 @@ class Translation(BaseTranslation):
         "Hub": "Hub",
         "inactive": "inaktiv",
         "Inverter manufacturer": "Wechselrichter-Hersteller",
+        "Load volatility": "Lastschwankung",
         "Maximum charge level": "Maximaler Ladestand",
         "Maximum inverter power": "Maximale Wechselrichter-Leistung",
         "Maximum power": "Maximale Leistung",
@@ -41,6 +42,7 @@ class Translation(BaseTranslation):
         "Output": "Ausgang",
         "Pack\u00a0{}": "Pack\u00a0{}",
         "Panel\u00a0{}": "Panel\u00a0{}",
+        "Polling interval": "Abfrageintervall",
         "Power": "Leistung",
         "Power import": "Bezug",
         "Remaining at limit": "Verbleibend bei Limit",
@@ -50,6 +52,7 @@ class Translation(BaseTranslation):
         "Settings": "Einstellungen",
         "Software version": "Software-Version",
         "Solar": "Solar",
+        "Stale data from {} ago": "Veraltete Daten von vor {}",
         "State of health": "Gesundheitszustand",
         "Target range": "Soll-Bereich",
         "Total power": "Gesamtleistung",
@@ -1,29 +1,64 @@
 import asyncio
 import binascii
-import bluetooth
+import gc
+import hashlib
 import json
-import math
-import network
 import os
 import sys
 import time
-from machine import WDT
 
-# https://github.com/micropython/micropython-lib
-import aioble
-import uaiohttpclient
+import config
+
+if config.SIMULATION:
+    # Host-side stand-ins for running without hardware
+    import sim
+    from sim import aioble, bluetooth, network, ntptime
+    from sim.machine import WDT
+else:
+    import bluetooth
+    import network
+    import ntptime
+    from machine import WDT
+
+    # https://github.com/micropython/micropython-lib
+    import aioble
 
 # https://github.com/miguelgrinberg/microdot
 from microdot import Microdot, Response, redirect
-
-import config
-from locale import get_translation
+from microdot.sse import with_sse
+
+from locale import get_translation, get_translations
+from solar.coalesce import coalesce
+from solar.commands import CommandQueue
+from solar.compress import GZIP, accepted_format, buffered, compress, compress_bytes
+from solar.control import power_limit
+from solar.histlog import HistoryLog
+from solar.history import CHANNELS as HISTORY_CHANNELS, History
+from solar.httpclient import HTTPClient
+from solar.jsonscan import FieldScanner
+from solar.jsonstream import encode
+from solar.reassemble import Reassembler
+from solar.ringbuf import RingBuffer
+from solar.store import (
+    HUB_PROPERTIES,
+    PACK_PROPERTIES,
+    PackList,
+    PropertyStore,
+    schema,
+)
 
 
 SERVICE_ID = bluetooth.UUID(0xA002)
 NOTIFY_ID = bluetooth.UUID(0xC305)
 WRITE_ID = bluetooth.UUID(0xC304)
 
+DATA_CAPACITY = 32
+SNAPSHOT_FILE = "snapshot.json"
+SNAPSHOT_INTERVAL = 10 * 60
+RENDER_CACHE_MIN_FREE = 48 * 1024
+COMPRESS_MIN_SIZE = 1024
+METER_PUSH_MAX_AGE = 30_000  # ms, the meter is polled with older pushed data
+
 
 __wdt = WDT()
 __wdt_monitors = []
@@ -33,7 +68,41 @@ network.hostname(config.HOSTNAME)
 __nic = network.WLAN(network.STA_IF)
 
 __data = {}
+__data_ring = RingBuffer(DATA_CAPACITY)  # __data["data"]
+__data_properties = PropertyStore(schema(HUB_PROPERTIES))  # __data["properties"]
+__data_packs = PackList(schema(PACK_PROPERTIES))  # __data["packData"]
+__data_ring_revisions = RingBuffer(DATA_CAPACITY)  # revision of __data_ring items
+__data_revisions = {}  # key of __data -> revision of the last change
+__data_evicted_revision = 0  # Revision of the newest item evicted from __data_ring
+__reset_revision = 0  # Revision in which __data was cleared
 __last_update_ticks_ms = None
+__snapshot_time = None  # Unix time of restored data, None when up to date
+__snapshot_restored = False  # Until the first getAll response replaces it
+__change_event = asyncio.Event()  # Replaced after every change
+__revision = 0  # Incremented after every change
+__boot_id = binascii.hexlify(os.urandom(4)).decode()
+__render_cache = {}  # lang[/part] -> rendered index page of the current revision
+__commands = CommandQueue()
+__ble_messages = Reassembler()
+# Counters and durations in milliseconds of the automatic power limit
+__control_stats = {
+    "period": round(config.CONTROL_PERIOD * 1000),
+    "volatility": None,  # W
+    "cycles": 0,
+    "pushes": 0,
+    "skipped": 0,
+    "overruns": 0,
+    "fetchLast": None,
+    "fetchMax": 0,
+    "cycleLast": None,
+    "cycleMax": 0,
+}
+__meter_pushed = asyncio.Event()
+__meter_push_data = None
+__meter_push_ticks = None
+__meter_last_incoming = None
+__history_log = HistoryLog(channels=len(HISTORY_CHANNELS))
+__history = History(log=__history_log)
 
 __ble_write_char = None  # None when disconnected
 
@@ -43,6 +112,22 @@ __meter_available = bool(
     and config.METER_POWER_DISPLAY_FIELD
 )
 __auto_power_limit = __meter_available and "auto-power-limit" in os.listdir()
+__meter_client = None
+if __meter_available:
+    try:
+        __meter_client = HTTPClient(config.METER_ENDPOINT)
+    except MemoryError:
+        raise
+    except Exception as e:
+        # Reported by every cycle of power_task instead of stopping the boot
+        sys.print_exception(e)
+# Separate scanners, a push may arrive while a polled response is received
+__meter_fields = FieldScanner(
+    (config.METER_POWER_FIELD, config.METER_POWER_DISPLAY_FIELD)
+)
+__meter_push_fields = FieldScanner(
+    (config.METER_POWER_FIELD, config.METER_POWER_DISPLAY_FIELD)
+)
 
 __auto_power_info_data = {}
 __auto_power_info_incoming = None
@@ -75,6 +160,17 @@ async def wifi_task():
     while True:
         __nic.active(True)
         __nic.connect(config.WIFI_SSID, config.WIFI_PASSWORD)
+        for _ in range(60):
+            await asyncio.sleep(1)
+            if __nic.isconnected():
+                # Logged history needs the real time across reboots
+                try:
+                    ntptime.settime()
+                except MemoryError:
+                    raise
+                except Exception as e:
+                    sys.print_exception(e)
+                break
         await asyncio.sleep(60 * 60)
         __nic.disconnect()
         __nic.active(False)
@@ -95,20 +191,45 @@ def ble_send(method, **options):
 
 
 def ble_set_output_power_limit(power):
-    inverter_max_power = __data.get("properties", {}).get("inverseMaxPower")
-    if inverter_max_power is None:
-        raise ValueError("inverter max power unknown")
-    if power > inverter_max_power:
-        raise ValueError("power limit must not exceed inverter max power")
-    if power < 100 and power % 30 != 0:
-        raise ValueError("if power limit is < 100, it must be a multiple of 30")
-    return ble_send("write", properties={"outputLimit": power})
+    ble_write(validate_properties({"outputLimit": power}))
+
+
+def ble_write(properties):
+    if not __ble_write_char:
+        raise ValueError("not connected")
+    __commands.write(properties)
+
+
+def notify_change():
+    global __change_event, __revision
+    __revision += 1
+    __render_cache.clear()
+    __change_event.set()
+    __change_event = asyncio.Event()
+
+
+def record_history():
+    props = __data_properties
+    charge = props.get("outputPackPower")
+    discharge = props.get("packInputPower")
+    __history.add(
+        int(time.time()),
+        props.get("solarInputPower"),
+        props.get("outputHomePower"),
+        charge - discharge if charge is not None and discharge is not None else None,
+        __auto_power_info_data.get(config.METER_POWER_DISPLAY_FIELD),
+        props.get("outputLimit"),
+    )
 
 
 async def ble_task():
-    global __ble_write_char, __data, __last_update_ticks_ms
+    global __ble_write_char, __last_update_ticks_ms, __snapshot_time
+    global __snapshot_restored, __reset_revision, __data_evicted_revision
     while True:
-        __ble_write_char = None
+        if __ble_write_char:
+            __ble_write_char = None
+            __commands.clear()
+            notify_change()
         try:
             device = aioble.Device(aioble.ADDR_PUBLIC, config.DEVICE_MAC)
             connection = await device.connect()
@@ -122,7 +243,18 @@ async def ble_task():
                     raise Exception("Service not found")
                 notify_char = await service.characteristic(NOTIFY_ID)
                 write_char_preliminary = await service.characteristic(WRITE_ID)
-                __data.clear()
+                __ble_messages.clear()
+                if __snapshot_time is None:
+                    __data.clear()
+                    __data_ring.clear()
+                    __data_properties.clear()
+                    __data_packs.clear()
+                    __data_ring_revisions.clear()
+                    __data_revisions.clear()
+                    __data_evicted_revision = 0
+                    __snapshot_restored = False
+                    notify_change()
+                    __reset_revision = __revision
                 get_info_sent = False
                 while True:
                     if (
@@ -133,40 +265,72 @@ async def ble_task():
                             "BLESPP not received within 60 seconds"
                         )
                     try:
-                        msg = json.loads(await notify_char.notified(timeout_ms=10_000))
+                        msg = __ble_messages.feed(
+                            await notify_char.notified(timeout_ms=10_000)
+                        )
                     except asyncio.TimeoutError:
                         continue
+                    if msg is None:
+                        continue
                     if msg.get("deviceId") != config.DEVICE_ID:
                         print(f"unexpected message: {msg}")
                         continue
                     __last_update_ticks_ms = time.ticks_ms()
                     if msg.get("method") == "BLESPP":
-                        __ble_write_char = write_char_preliminary
-                        await ble_send("BLESPP_OK")
+                        if not __ble_write_char:
+                            __ble_write_char = write_char_preliminary
+                            notify_change()
+                        __commands.send("BLESPP_OK")
                         if get_info_sent:
                             continue
-                        await ble_send("getInfo")
-                        await ble_send("read", properties=["getAll"])
+                        __commands.send("getInfo")
+                        __commands.send("read", properties=["getAll"])
                         get_info_sent = True
                         continue
+                    revision = __revision + 1  # of the notify_change() below
+                    changed = False
+                    if (
+                        __snapshot_restored
+                        and "properties" in msg
+                        and "packData" in msg
+                    ):
+                        # The getAll response is complete, drop restored
+                        # properties and packs that it doesn't carry
+                        __data_properties.clear()
+                        __data_packs.clear()
+                        __snapshot_restored = False
+                        __reset_revision = revision
+                        changed = True
                     for key in ["deviceSn", "modules", "firmwares", "offData"]:
-                        if key in msg:
+                        if key in msg and __data.get(key) != msg[key]:
                             __data[key] = msg[key]
+                            __data_revisions[key] = revision
+                            changed = True
                     if "data" in msg:
-                        __data["data"] = __data.get("data", [])
-                        __data["data"].extend(msg["data"])
+                        __data["data"] = __data_ring
+                        for item in msg["data"]:
+                            if len(__data_ring_revisions) == DATA_CAPACITY:
+                                __data_evicted_revision = next(
+                                    iter(__data_ring_revisions)
+                                )
+                            __data_ring.append(item)
+                            __data_ring_revisions.append(revision)
+                            changed = True
                     if "properties" in msg:
-                        __data["properties"] = __data.get("properties", {})
-                        __data["properties"].update(msg["properties"])
+                        __data["properties"] = __data_properties
+                        if __data_properties.update(msg["properties"], revision):
+                            changed = True
+                        __commands.acknowledge(msg["properties"])
+                        if __snapshot_time is not None:
+                            __snapshot_time = None
+                            changed = True
+                        record_history()
                     if "packData" in msg:
-                        __data["packData"] = __data.get("packData", [])
-                        for pack in msg["packData"]:
-                            for i, old_pack in enumerate(__data["packData"]):
-                                if old_pack["sn"] == pack["sn"]:
-                                    old_pack.update(pack)
-                                    break
-                            else:
-                                __data["packData"].append(pack)
+                        __data["packData"] = __data_packs
+                        if __data_packs.update(msg["packData"], revision):
+                            changed = True
+                    if changed:
+                        notify_change()
         except MemoryError:
             raise
         except Exception as e:
@@ -174,6 +338,79 @@ async def ble_task():
             await asyncio.sleep(60)
 
 
+def save_snapshot():
+    snapshot = {
+        "time": int(time.time()),
+        "deviceSn": __data.get("deviceSn"),
+        "properties": dict(__data_properties.items()),
+        "packData": [dict(pack.items()) for pack in __data_packs],
+        "autoPowerInfo": [
+            __auto_power_info_data,
+            __auto_power_info_incoming,
+            __auto_power_info_total,
+            __auto_power_info_remaining,
+            __auto_power_info_new_limit,
+            __auto_power_info_skip,
+            __auto_power_info_active,
+        ],
+    }
+    with open(f"{SNAPSHOT_FILE}.tmp", "w") as f:
+        json.dump(snapshot, f)
+    os.rename(f"{SNAPSHOT_FILE}.tmp", SNAPSHOT_FILE)
+
+
+def load_snapshot():
+    global __snapshot_time, __snapshot_restored
+    global __auto_power_info_data, __auto_power_info_incoming
+    global __auto_power_info_total, __auto_power_info_remaining
+    global __auto_power_info_new_limit, __auto_power_info_skip
+    global __auto_power_info_active
+    try:
+        with open(SNAPSHOT_FILE) as f:
+            snapshot = json.load(f)
+    except OSError:
+        return
+    if snapshot["deviceSn"] is not None:
+        __data["deviceSn"] = snapshot["deviceSn"]
+    if snapshot["properties"]:
+        __data["properties"] = __data_properties
+        __data_properties.update(snapshot["properties"])
+    if snapshot["packData"]:
+        __data["packData"] = __data_packs
+        __data_packs.update(snapshot["packData"])
+    (
+        __auto_power_info_data,
+        __auto_power_info_incoming,
+        __auto_power_info_total,
+        __auto_power_info_remaining,
+        __auto_power_info_new_limit,
+        __auto_power_info_skip,
+        __auto_power_info_active,
+    ) = snapshot["autoPowerInfo"]
+    __snapshot_time = snapshot["time"]
+    __snapshot_restored = True
+
+
+def snapshot_age():
+    if __snapshot_time is None:
+        return None
+    age = int(time.time()) - __snapshot_time
+    return age if age >= 0 else None
+
+
+async def snapshot_task():
+    while True:
+        await asyncio.sleep(SNAPSHOT_INTERVAL)
+        if not __ble_write_char or __snapshot_time is not None:
+            continue
+        try:
+            save_snapshot()
+        except MemoryError:
+            raise
+        except Exception as e:
+            sys.print_exception(e)
+
+
 async def get_info_task():
     last_request = None
     while True:
@@ -188,40 +425,115 @@ async def get_info_task():
             raise Exception("stale BLE connection")
         last_request = time.ticks_ms()
         try:
-            await ble_send("getInfo")
-            await ble_send("read", properties=["getAll"])
+            __commands.send("getInfo")
+            __commands.send("read", properties=["getAll"])
         except MemoryError:
             raise
         except Exception as e:
             sys.print_exception(e)
 
 
+def check_meter_data(meter_data):
+    if not (
+        isinstance(meter_data, dict)
+        and isinstance(meter_data.get(config.METER_POWER_FIELD), (float, int, None))
+        and isinstance(
+            meter_data.get(config.METER_POWER_DISPLAY_FIELD),
+            (float, int, None),
+        )
+    ):
+        raise TypeError(f"invalid meter data: {meter_data!r}")
+    return meter_data
+
+
+def adapt_control_period(incoming):
+    """Shorten the period while the power import changes, else back off"""
+    global __meter_last_incoming
+    if incoming is None:
+        return
+    stats = __control_stats
+    if __meter_last_incoming is not None:
+        change = abs(incoming - __meter_last_incoming)
+        stats["volatility"] = round(
+            (change + (stats["volatility"] or 0)) / 2  # Moving average
+        )
+    __meter_last_incoming = incoming
+    minimum = round(config.CONTROL_PERIOD_MIN * 1000)
+    maximum = round(config.CONTROL_PERIOD * 1000)
+    threshold = (config.POWER_UPPER_LIMIT - config.POWER_LOWER_LIMIT) / 2
+    if stats["volatility"] is not None and stats["volatility"] > threshold:
+        stats["period"] = minimum
+    else:
+        stats["period"] = max(minimum, min(maximum, stats["period"] * 2))
+
+
+def control_time(name, start):
+    duration = time.ticks_diff(time.ticks_ms(), start)
+    __control_stats[f"{name}Last"] = duration
+    __control_stats[f"{name}Max"] = max(__control_stats[f"{name}Max"], duration)
+
+
+def auto_power_info():
+    """Values of the automatic power limit that are shown on the index page"""
+    return (
+        tuple(__auto_power_info_data.items()),
+        __auto_power_info_incoming,
+        __auto_power_info_total,
+        __auto_power_info_remaining,
+        __auto_power_info_new_limit,
+        __auto_power_info_skip,
+        __auto_power_info_active,
+        __control_stats["period"],
+        __control_stats["volatility"],
+    )
+
+
 async def power_task():
     global __auto_power_info_incoming, __auto_power_info_total
     global __auto_power_info_remaining, __auto_power_info_new_limit
     global __auto_power_info_skip, __auto_power_info_active
     global __auto_power_info_data
+    deadline = time.ticks_ms()
     while True:
-        await asyncio.sleep(60)
+        # Cycles start at fixed times regardless of fetch and write latency
+        deadline = time.ticks_add(deadline, __control_stats["period"])
+        wait = time.ticks_diff(deadline, time.ticks_ms())
+        if wait < 0:
+            __control_stats["overruns"] += 1
+            deadline = time.ticks_ms()
+        else:
+            try:
+                await asyncio.wait_for_ms(__meter_pushed.wait(), wait)
+                deadline = time.ticks_ms()  # Pushed data starts a new cycle
+            except asyncio.TimeoutError:
+                pass
+        __meter_pushed.clear()
         if not __meter_available:
             continue
+        cycle_start = time.ticks_ms()
+        if __commands.unconfirmed():
+            __control_stats["skipped"] += 1
+            continue
+        info = auto_power_info()
         try:
             try:
-                resp = await uaiohttpclient.request("GET", config.METER_ENDPOINT)
-                if resp.status != 200:
-                    raise TypeError(f"invalid meter status code: {resp.status!r}")
-                meter_data = json.loads(await resp.read())
-                if not (
-                    isinstance(meter_data, dict)
-                    and isinstance(
-                        meter_data.get(config.METER_POWER_FIELD), (float, int, None)
-                    )
-                    and isinstance(
-                        meter_data.get(config.METER_POWER_DISPLAY_FIELD),
-                        (float, int, None),
-                    )
+                if __meter_push_ticks is not None and (
+                    time.ticks_diff(cycle_start, __meter_push_ticks)
+                    < METER_PUSH_MAX_AGE
                 ):
-                    raise TypeError(f"invalid meter data: {meter_data!r}")
+                    meter_data = __meter_push_data
+                else:
+                    # Poll when the meter doesn't push its data
+                    if __meter_client is None:
+                        raise ValueError(
+                            f"invalid meter endpoint: {config.METER_ENDPOINT!r}"
+                        )
+                    __meter_fields.reset()
+                    status = await __meter_client.get(__meter_fields.feed)
+                    if status != 200:
+                        raise TypeError(f"invalid meter status code: {status!r}")
+                    meter_data = check_meter_data(__meter_fields.finish())
+                    control_time("fetch", cycle_start)
             except Exception:
                 __auto_power_info_data = {}
                 props = __data.get("properties", {})
@@ -236,9 +548,10 @@ async def power_task():
                     and __auto_power_limit
                 )
                 if is_active and output_power_limit != 0:
-                    await ble_set_output_power_limit(0)
+                    ble_set_output_power_limit(0)
                 raise
             __auto_power_info_data = meter_data
+            record_history()
             props = __data.get("properties", {})
             output_power = props.get("outputHomePower")
             output_power_limit = props.get("outputLimit")
@@ -251,27 +564,17 @@ async def power_task():
                 and __auto_power_limit
             )
             incoming = meter_data.get(config.METER_POWER_FIELD)
+            adapt_control_period(incoming)
             if not is_active or incoming is None:
                 __auto_power_info_active = False
                 continue
-            total = incoming + output_power
-            remaining = total - output_power_limit
-            target = round(
-                total - (config.POWER_LOWER_LIMIT + config.POWER_UPPER_LIMIT) / 2
-            )
-            new_limit = max(0, min(math.floor(inverter_max_power), round(target)))
-            if new_limit < 100:
-                new_limit = (new_limit // 30) * 30
-            skip = (
-                (
-                    config.POWER_LOWER_LIMIT <= remaining
-                    and remaining <= config.POWER_UPPER_LIMIT
-                )
-                or output_power_limit == new_limit
-                or (
-                    new_limit > output_power_limit
-                    and output_power * 1.2 + 20 <= output_power_limit
-                )
+            total, remaining, new_limit, skip = power_limit(
+                incoming,
+                output_power,
+                output_power_limit,
+                inverter_max_power,
+                config.POWER_LOWER_LIMIT,
+                config.POWER_UPPER_LIMIT,
             )
             __auto_power_info_incoming = incoming
             __auto_power_info_total = total
@@ -280,12 +583,17 @@ async def power_task():
             __auto_power_info_skip = skip
             __auto_power_info_active = True
             if not skip:
-                await ble_set_output_power_limit(new_limit)
+                ble_set_output_power_limit(new_limit)
         except MemoryError:
             raise
         except Exception as e:
             sys.print_exception(e)
             __auto_power_info_active = False
+        finally:
+            __control_stats["cycles"] += 1
+            control_time("cycle", cycle_start)
+            if auto_power_info() != info:
+                notify_change()
 
 
 app = Microdot()
@@ -321,43 +629,133 @@ def q(s):
     )
 
 
-async def html_header_stream(t, title):
-    yield "<!doctype html>"
-    yield f'<html lang="{q(t.lang)}">'
-    yield '<meta charset="utf-8">'
-    yield ('<meta content="width=device-width, initial-scale=1" name="viewport">')
-    yield f"<title>{q(title)}</title>"
-    yield "<style>"
-    yield ":root {"
-    yield "color-scheme:light dark;"
-    yield "}"
-    yield ".error {"
-    yield "background:Canvas;"
-    yield "color:red;"
-    yield "position:sticky;"
-    yield "top:0;"
-    yield "}"
-    yield ":link, :visited {"
-    yield "color:LinkText;"
-    yield "text-decoration:none;"
-    yield "}"
-    yield ".inactive {"
-    yield "opacity:0.2;"
-    yield "}"
-    yield "label, select, button {"
-    yield "display:block;"
-    yield "margin:8px 0;"
-    yield "}"
-    yield "input[type=number], select, button {"
-    yield "min-width:calc(min(15rem,100%));"
-    yield "}"
-    yield "input[type=radio] {"
-    yield "margin-right:0.5em;"
-    yield "}"
-    yield ".line-through {"
-    yield "text-decoration-line:line-through;"
-    yield "}"
-    yield "</style>"
+# name: content type of precompressed files in /static
+STATIC_ASSETS = {
+    "refresh.js": "text/javascript",
+    "style.css": "text/css",
+}
+STATIC_MAX_AGE = 365 * 24 * 60 * 60
+
+
+def static_url(name):
+    """URL of a static asset with a hash of its content for cache busting"""
+    h = hashlib.sha256()
+    buffer = bytearray(256)
+    try:
+        with open(f"static/{name}.gz", "rb") as f:
+            while n := f.readinto(buffer):
+                h.update(memoryview(buffer)[:n])
+    except OSError as e:
+        sys.print_exception(e)
+        return f"/static/{name}"
+    return f"/static/{name}?v={binascii.hexlify(h.digest()[:6]).decode()}"
+
+
+__static_urls = {name: static_url(name) for name in STATIC_ASSETS}
+
+pvBrands = ["Hoymiles", "Enphase", "APsystems", "Anker", "Deye", "BossWerk", "Tsun"]
+
+ON_OFF = ((1, "On"), (0, "Off"))
+# name: fields of (form field, property, heading, input type, options)
+# output-limit has its own handlers for the automatic mode
+SETTINGS = {
+    "output-limit": (("limit", "outputLimit", "Maximum power", "number", None),),
+    "min-soc": (("value", "minSoc", "Minimum charge level", "number", None),),
+    "soc-set": (("value", "socSet", "Maximum charge level", "number", None),),
+    "hub-state": (("value", "hubState", "Automatic shutdown", "radio", ON_OFF),),
+    "pass-mode": (
+        ("value", "passMode", "Bypass", "radio", ((0, "Auto"), (2, "On"), (1, "Off"))),
+    ),
+    "buzzer-switch": (("value", "buzzerSwitch", "Buzzer", "radio", ON_OFF),),
+    "auto-recover": (
+        ("value", "autoRecover", "Reset bypass to auto after one day", "radio", ON_OFF),
+    ),
+    "inverse": (
+        ("limit", "inverseMaxPower", "Maximum inverter power", "number", None),
+        (
+            "brand",
+            "pvBrand",
+            "Inverter manufacturer",
+            "select",
+            tuple(enumerate(["Other", *pvBrands])),
+        ),
+    ),
+}
+
+
+def html_fragments(t):
+    """Static parts of pages for a language"""
+    header_start = (
+        "<!doctype html>"
+        + f'<html lang="{q(t.lang)}">'
+        + '<meta charset="utf-8">'
+        + '<meta content="width=device-width, initial-scale=1" name="viewport">'
+        + "<title>"
+    )
+    header_end = f'</title><link href="{__static_urls["style.css"]}" rel="stylesheet">'
+    apply = f"{q(t("Apply"))}</button>"
+    reset = f'<button type="reset">{q(t("Reset"))}</button></form>'
+    fragments = {
+        "header-start": header_start.encode(),
+        "header-end": header_end.encode(),
+        "settings-footer": f'<button type="submit">{apply}{reset}'.encode(),
+        "output-limit-footer": (
+            f'<button type="submit" name="mode" value="manual">{apply}{reset}'
+        ).encode(),
+        "output-limit-auto": (
+            '<form method="POST" action="/settings/output-limit">'
+            + f'<button type="submit" name="mode" value="auto">{q(t("Auto"))}'
+            + "</button></form>"
+        ).encode(),
+    }
+    title = q(f"{t("Solar")} - {t("Settings")}")
+    for name, ((_, _, heading, input_type, _), *_) in SETTINGS.items():
+        # Radio buttons have their own labels
+        labelled = input_type != "radio"
+        fragments[f"settings/{name}"] = (
+            f"{header_start}{title}{header_end}<h1>{title}</h1>"
+            + f'<form method="POST" action="/settings/{name}">'
+            + ("<label>" if labelled else "")
+            + f"<h2>{q(t(heading))}</h2>"
+        ).encode()
+    return fragments
+
+
+__html_fragments = {t.lang: html_fragments(t) for t in get_translations()}
+
+
+def html_header_stream(t, title):
+    fragments = __html_fragments[t.lang]
+    yield fragments["header-start"]
+    yield q(title)
+    yield fragments["header-end"]
+
+
+def etag(*parts):
+    """Entity tag of the current data revision or None when not cacheable"""
+    if __snapshot_time is not None:
+        return None  # Depends on the age of the data
+    return f'"{"-".join(str(part) for part in (__boot_id, __revision, *parts))}"'
+
+
+def not_modified(request, tag):
+    """Response for a conditional request that matches `tag` or None"""
+    if tag is None:
+        return None
+    for candidate in request.headers.get("If-None-Match", "").split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == tag or candidate == "*":
+            return Response(status_code=304, headers={"ETag": tag})
+    return None
+
+
+def cache_headers(tag, headers):
+    if tag is not None:
+        headers["ETag"] = tag
+        headers["Cache-Control"] = "no-cache"
+    return headers
 
 
 def html_error(t, message, status=400):
@@ -376,7 +774,12 @@ def html_error(t, message, status=400):
 
 @app.before_request
 async def check_csrf(request):
-    if request.method not in ("GET", "HEAD") and "csrf" not in request.cookies:
+    # Cross-site forms can't send JSON without a CORS preflight
+    if (
+        request.method not in ("GET", "HEAD")
+        and "csrf" not in request.cookies
+        and (request.content_type or "").split(";")[0] != "application/json"
+    ):
         return html_error(get_translation(request), "csrf cookie missing", 403)
 
 
@@ -386,336 +789,555 @@ async def set_csrf_cookie(request, response):
     response.headers["Set-Cookie"].append("csrf=; SameSite=Strict; Path=/; HttpOnly")
 
 
-pvBrands = ["Hoymiles", "Enphase", "APsystems", "Anker", "Deye", "BossWerk", "Tsun"]
+@app.after_request
+async def compress_body(request, response):
+    if not config.COMPRESS_RESPONSES or response.status_code != 200:
+        return
+    content_type = response.headers.get("Content-Type", "")
+    if "Content-Encoding" in response.headers or not content_type.startswith(
+        ("text/html", "application/json")
+    ):
+        return
+    format = accepted_format(request.headers.get("Accept-Encoding", ""))
+    vary = response.headers.get("Vary")
+    if not vary:
+        response.headers["Vary"] = "Accept-Encoding"
+    elif "Accept-Encoding" not in vary:
+        response.headers["Vary"] = f"{vary}, Accept-Encoding"
+    if format is None:
+        return
+    body = response.body
+    if hasattr(body, "__next__"):
+        # Short streams are sent as they are, like short bodies
+        body = response.body = buffered(body, COMPRESS_MIN_SIZE)
+    if isinstance(body, bytes):
+        if len(body) < COMPRESS_MIN_SIZE:
+            return
+        response.body = compress_bytes(body, format)
+    elif hasattr(body, "__next__"):
+        response.body = compress(body, format)
+    else:
+        return
+    set_content_encoding(response.headers, format)
+
+
+def set_content_encoding(headers, format):
+    headers["Content-Encoding"] = "gzip" if format == GZIP else "deflate"
+    # The representation differs from the uncompressed one
+    tag = headers.get("ETag")
+    if tag and not tag.startswith("W/"):
+        headers["ETag"] = f"W/{tag}"
+
+
+@app.after_request
+async def coalesce_body(request, response):
+    # Avoid a TCP segment for every yielded chunk of streamed responses
+    if hasattr(response.body, "__next__") and not response.headers.get(
+        "Content-Type", ""
+    ).startswith("text/event-stream"):
+        response.body = coalesce(response.body)
+
+
+# property: minimum, maximum, step, factor of the hub value
+PROPERTY_RULES = {
+    "autoRecover": (0, 1, 1, 1),
+    "buzzerSwitch": (0, 1, 1, 1),
+    "hubState": (0, 1, 1, 1),
+    "inverseMaxPower": (100, 1200, 100, 1),
+    "minSoc": (0, 50, 1, 10),
+    "outputLimit": (0, None, 1, 1),
+    "passMode": (0, 2, 1, 1),
+    "pvBrand": (0, len(pvBrands), 1, 1),
+    "socSet": (70, 100, 1, 10),
+}
+
+
+def validate_properties(properties):
+    """Check writable properties and return them as hub values"""
+    result = {}
+    for key, value in properties.items():
+        rule = PROPERTY_RULES.get(key)
+        if rule is None:
+            raise ValueError(f"unknown property: {key}")
+        if type(value) is not int:
+            raise ValueError(f"{key} must be an integer")
+        minimum, maximum, step, factor = rule
+        if maximum is None and value < minimum:
+            raise ValueError(f"{key} must be >= {minimum}")
+        if maximum is not None and not minimum <= value <= maximum:
+            raise ValueError(f"{key} must be >= {minimum} and <= {maximum}")
+        if value % step:
+            raise ValueError(f"{key} must be a multiple of {step}")
+        result[key] = value * factor
+    power = result.get("outputLimit")
+    if power is not None:
+        inverter_max_power = result.get(
+            "inverseMaxPower", __data.get("properties", {}).get("inverseMaxPower")
+        )
+        if inverter_max_power is None:
+            raise ValueError("inverter max power unknown")
+        if power > inverter_max_power:
+            raise ValueError("power limit must not exceed inverter max power")
+        if power < 100 and power % 30 != 0:
+            raise ValueError("if power limit is < 100, it must be a multiple of 30")
+    return result
+
+
+def set_auto_power_limit(enabled):
+    global __auto_power_limit
+    if enabled == __auto_power_limit:
+        return
+    if enabled:
+        if not __meter_available:
+            raise ValueError("meter not available")
+        open("auto-power-limit", "a").close()
+    else:
+        os.remove("auto-power-limit")
+    __auto_power_limit = enabled
+    notify_change()
+
+
+@app.get("/static/<name>")
+def static(request, name):
+    content_type = STATIC_ASSETS.get(name)
+    if content_type is None:
+        return "Not found", 404
+    return Response.send_file(
+        f"static/{name}.gz",
+        content_type=content_type,
+        compressed=True,
+        max_age=STATIC_MAX_AGE,
+    )
 
 
 @app.get("/diagram.svg")
 def diagram_svg(request):
     return Response.send_file(
-        "/diagram.svgz", content_type="image/svg+xml", compressed=True, max_age=60 * 60
+        "diagram.svgz", content_type="image/svg+xml", compressed=True, max_age=60 * 60
     )
 
 
-@app.get("/")
-def index(request):
-    async def stream(t):
-        def enum(index, *entries):
-            if index is None or index < 0 or len(entries) <= index:
-                return t.no_value
-            return entries[index]
-
-        def kv(
-            name,
-            value,
-            extra=None,
-            *,
-            setting=None,
-            raw_name=False,
-            raw_value=False,
-            raw_extra=False,
-            class_name=None,
-        ):
-            name = name if raw_name else q(name or t.no_value)
-            value = value if raw_value else q(value or t.no_value)
-            extra = extra if raw_extra else (q(extra) if extra is not None else None)
-            s = f"{name}: {value}"
-            if extra:
-                s += f" ({extra})"
-            if setting:
-                s += f' <a href="{q("/settings/"+setting)}" title="{q(t("Settings"))}">⚙︎</a>'
-            return (
-                "<p" + (f' class="{q(class_name)}"' if class_name else "") + f">{s}</p>"
-            )
-
-        props = __data.get("properties", {})
-        packs = __data.get("packData", [])
-        title = t("Solar")
-        yield from html_header_stream(t, title)
-        if config.REFRESH_WEBPAGE:
-            yield '<style onload="' + q(
-                f"const refreshInterval = {config.REFRESH_WEBPAGE * 1000:.0f};"
-                + 'const errorElement = document.getElementById("error");'
-                + "let startTime = Date.now();"
-                + "let timeoutId = 0;"
-                + "async function update() {"
-                + "window.clearTimeout(timeoutId);"
-                + 'document.removeEventListener("visibilitychange", update);'
-                + "if (document.hidden) {"
-                + 'console.debug("Update: document hidden");'
-                + 'document.addEventListener("visibilitychange", update);'
-                + "return;"
-                + "}"
-                + "const elapsed = Date.now() - startTime;"
-                + "if (elapsed >= 0 && elapsed < refreshInterval) {"
-                + "const wait = refreshInterval - elapsed;"
-                + 'console.debug("Update: waiting", wait);'
-                + "timeoutId = window.setTimeout(update, wait);"
-                + 'document.addEventListener("visibilitychange", update);'
-                + "return;"
-                + "}"
-                + "if (elapsed < 0 || elapsed >= refreshInterval*2) {"
-                + 'console.debug("Update: stale");'
-                + 'if (errorElement) errorElement.style.removeProperty("display");'
-                + "}"
-                + 'console.debug("Update: fetch");'
-                + "try {"
-                + "const resp = await fetch(location.href);"
-                + "if(!resp.ok){"
-                + "throw new Error(`Response status: ${resp.status}`);"
-                + "}"
-                + "document.documentElement.innerHTML = await resp.text();"
-                + 'console.debug("Update: success");'
-                + "} catch (err) {"
-                + 'console.error("Update: error", err);'
-                + 'if (errorElement) errorElement.style.removeProperty("display");'
-                + "startTime = Date.now();"
-                + "update();"
-                + "}"
-                + "}"
-                + "update();"
-            ) + '"></style>'
-        yield f"<h1>{q(title)}</h1>"
-        yield '<h2 id="error" class="error"'
-        if __ble_write_char:
-            yield ' style="display:none"'
-        yield f'>{q(t("No connection"))}</h2>'
-        yield '<svg xmlns="http://www.w3.org/2000/svg"'
-        yield ' width="1024" height="700" viewBox="0 0 1024 700"'
-        yield ' style="'
-        yield "max-width:calc(min(100%,30rem));"
-        yield "height:auto;"
-        yield '">'
-        svg_text_attr = 'font-size="40px" fill="currentColor"'
-        yield '<use href="diagram.svg#home"/>'
-        yield '<use href="diagram.svg#inverter"/>'
-        yield '<use href="diagram.svg#solar"/>'
-        value = props.get("solarInputPower")
-        if value:
-            yield '<use href="diagram.svg#solar-inverter"/>'
-            yield '<use href="diagram.svg#solar-sun"/>'
-            yield f'<text x="776.106" y="221.521" {svg_text_attr}'
-            yield ' dominant-baseline="middle" text-anchor="start">'
-            yield q(t.number(value, "W"))
-            yield "</text>"
+def enum(t, index, *entries):
+    if index is None or index < 0 or len(entries) <= index:
+        return t.no_value
+    return entries[index]
+
+
+def kv(
+    t,
+    name,
+    value,
+    extra=None,
+    *,
+    setting=None,
+    raw_name=False,
+    raw_value=False,
+    raw_extra=False,
+    class_name=None,
+):
+    name = name if raw_name else q(name or t.no_value)
+    value = value if raw_value else q(value or t.no_value)
+    extra = extra if raw_extra else (q(extra) if extra is not None else None)
+    s = f"{name}: {value}"
+    if extra:
+        s += f" ({extra})"
+    if setting:
+        s += f' <a href="{q("/settings/"+setting)}" title="{q(t("Settings"))}">⚙︎</a>'
+    return "<p" + (f' class="{q(class_name)}"' if class_name else "") + f">{s}</p>"
+
+
+def index_status(t):
+    yield '<h2 id="error" class="error"'
+    if __ble_write_char:
+        yield ' style="display:none"'
+    yield f'>{q(t("No connection"))}</h2>'
+    if __snapshot_time is not None:
+        yield "<p>"
+        age = snapshot_age()
+        age = t.minutes(age / 60) if age is not None else t.no_value
+        yield q(t("Stale data from {} ago", age))
+        yield "</p>"
+
+
+def index_diagram(t):
+    props = __data.get("properties", {})
+    packs = __data.get("packData", [])
+    yield '<svg xmlns="http://www.w3.org/2000/svg"'
+    yield ' width="1024" height="700" viewBox="0 0 1024 700"'
+    yield ' style="'
+    yield "max-width:calc(min(100%,30rem));"
+    yield "height:auto;"
+    yield '">'
+    svg_text_attr = 'font-size="40px" fill="currentColor"'
+    yield '<use href="diagram.svg#home"/>'
+    yield '<use href="diagram.svg#inverter"/>'
+    yield '<use href="diagram.svg#solar"/>'
+    value = props.get("solarInputPower")
+    if value:
+        yield '<use href="diagram.svg#solar-inverter"/>'
+        yield '<use href="diagram.svg#solar-sun"/>'
+        yield f'<text x="776.106" y="221.521" {svg_text_attr}'
+        yield ' dominant-baseline="middle" text-anchor="start">'
+        yield q(t.number(value, "W"))
+        yield "</text>"
+    else:
+        yield '<use href="diagram.svg#inverter-solar-conn"/>'
+        if value == 0:
+            yield '<use href="diagram.svg#inverter-solar-x"/>'
+    value = props.get("outputHomePower")
+    if value:
+        yield '<use href="diagram.svg#inverter-home"/>'
+        yield f'<text x="572.641" y="348.146" {svg_text_attr}'
+        yield ' dominant-baseline="hanging" text-anchor="middle">'
+        yield q(t.number(value, "W"))
+        yield "</text>"
+    else:
+        yield '<use href="diagram.svg#home-inverter-conn"/>'
+        if value == 0:
+            yield '<use href="diagram.svg#home-inverter-x"/>'
+    if packs:
+        yield '<use href="diagram.svg#battery"/>'
+        value = props.get("packState")
+        if value == 1:
+            yield '<use href="diagram.svg#inverter-battery"/>'
+            value = props.get("outputPackPower")
+            if value:
+                yield f'<text x="776.107" y="504.743" {svg_text_attr}'
+                yield ' dominant-baseline="middle" text-anchor="start">'
+                yield q(t.number(value, "W"))
+                yield "</text>"
+        elif value == 2:
+            yield '<use href="diagram.svg#battery-inverter"/>'
+            value = props.get("packInputPower")
+            if value:
+                yield f'<text x="776.107" y="504.743" {svg_text_attr}'
+                yield ' dominant-baseline="middle" text-anchor="start">'
+                yield q(t.number(value, "W"))
+                yield "</text>"
         else:
-            yield '<use href="diagram.svg#inverter-solar-conn"/>'
+            yield '<use href="diagram.svg#battery-inverter-conn"/>'
             if value == 0:
-                yield '<use href="diagram.svg#inverter-solar-x"/>'
-        value = props.get("outputHomePower")
+                yield '<use href="diagram.svg#battery-inverter-x"/>'
+        value = props.get("electricLevel")
+        if value is not None:
+            yield f'<text x="848.775" y="638.686" {svg_text_attr}'
+            yield ' dominant-baseline="middle" text-anchor="start">'
+            yield q(t.number(value, "%"))
+            yield "</text>"
+        values = [
+            normalize_temp(temp)
+            for temp in (pack.get("maxTemp") for pack in packs)
+            if temp is not None
+        ]
+        value = max(values) if values else None
+        if value:
+            yield f'<text x="658.158" y="638.686" {svg_text_attr}'
+            yield ' dominant-baseline="middle" text-anchor="end">'
+            yield q(t.number(value, "°C"))
+            yield "</text>"
+    if __meter_available:
+        yield '<use href="diagram.svg#grid"/>'
+        value = __auto_power_info_data.get(config.METER_POWER_DISPLAY_FIELD)
         if value:
-            yield '<use href="diagram.svg#inverter-home"/>'
-            yield f'<text x="572.641" y="348.146" {svg_text_attr}'
-            yield ' dominant-baseline="hanging" text-anchor="middle">'
-            yield q(t.number(value, "W"))
+            if value < 0:
+                yield '<use href="diagram.svg#home-grid"/>'
+            else:
+                yield '<use href="diagram.svg#grid-home"/>'
+            yield f'<text x="315.023" y="428.873" {svg_text_attr}'
+            yield ' dominant-baseline="middle" text-anchor="end">'
+            yield q(t.number(abs(value), "W"))
             yield "</text>"
         else:
-            yield '<use href="diagram.svg#home-inverter-conn"/>'
+            yield '<use href="diagram.svg#grid-home-conn"/>'
             if value == 0:
-                yield '<use href="diagram.svg#home-inverter-x"/>'
-        if packs:
-            yield '<use href="diagram.svg#battery"/>'
-            value = props.get("packState")
-            if value == 1:
-                yield '<use href="diagram.svg#inverter-battery"/>'
-                value = props.get("outputPackPower")
-                if value:
-                    yield f'<text x="776.107" y="504.743" {svg_text_attr}'
-                    yield ' dominant-baseline="middle" text-anchor="start">'
-                    yield q(t.number(value, "W"))
-                    yield "</text>"
-            elif value == 2:
-                yield '<use href="diagram.svg#battery-inverter"/>'
-                value = props.get("packInputPower")
-                if value:
-                    yield f'<text x="776.107" y="504.743" {svg_text_attr}'
-                    yield ' dominant-baseline="middle" text-anchor="start">'
-                    yield q(t.number(value, "W"))
-                    yield "</text>"
-            else:
-                yield '<use href="diagram.svg#battery-inverter-conn"/>'
-                if value == 0:
-                    yield '<use href="diagram.svg#battery-inverter-x"/>'
-            value = props.get("electricLevel")
-            if value is not None:
-                yield f'<text x="848.775" y="638.686" {svg_text_attr}'
-                yield ' dominant-baseline="middle" text-anchor="start">'
-                yield q(t.number(value, "%"))
-                yield "</text>"
-            values = [
-                normalize_temp(temp)
-                for temp in (pack.get("maxTemp") for pack in packs)
-                if temp is not None
-            ]
-            value = max(values) if values else None
-            if value:
-                yield f'<text x="658.158" y="638.686" {svg_text_attr}'
-                yield ' dominant-baseline="middle" text-anchor="end">'
-                yield q(t.number(value, "°C"))
-                yield "</text>"
-        if __meter_available:
-            yield '<use href="diagram.svg#grid"/>'
-            value = __auto_power_info_data.get(config.METER_POWER_DISPLAY_FIELD)
-            if value:
-                if value < 0:
-                    yield '<use href="diagram.svg#home-grid"/>'
-                else:
-                    yield '<use href="diagram.svg#grid-home"/>'
-                yield f'<text x="315.023" y="428.873" {svg_text_attr}'
-                yield ' dominant-baseline="middle" text-anchor="end">'
-                yield q(t.number(abs(value), "W"))
-                yield "</text>"
-            else:
-                yield '<use href="diagram.svg#grid-home-conn"/>'
-                if value == 0:
-                    yield '<use href="diagram.svg#grid-home-x"/>'
-        if props.get("pass"):
-            yield '<use href="diagram.svg#bypass"/>'
-        yield "</svg>"
-        yield f'<h2>{q(t("Hub"))}</h2>'
-        yield kv(t("Serial number"), __data.get("deviceSn"))
-        yield kv(t("Software version"), props.get("masterSoftVersion"))
-        yield kv(
-            t("Buzzer"),
-            enum(props.get("buzzerSwitch"), t("Off"), t("On")),
-            setting="buzzer-switch",
-        )
+                yield '<use href="diagram.svg#grid-home-x"/>'
+    if props.get("pass"):
+        yield '<use href="diagram.svg#bypass"/>'
+    yield "</svg>"
+
+
+def index_hub(t):
+    props = __data.get("properties", {})
+    yield f'<h2>{q(t("Hub"))}</h2>'
+    yield kv(t, t("Serial number"), __data.get("deviceSn"))
+    yield kv(t, t("Software version"), props.get("masterSoftVersion"))
+    yield kv(
+        t,
+        t("Buzzer"),
+        enum(t, props.get("buzzerSwitch"), t("Off"), t("On")),
+        setting="buzzer-switch",
+    )
+    yield kv(
+        t,
+        t("Automatic shutdown"),
+        enum(t, props.get("hubState"), t("Off"), t("On")),
+        setting="hub-state",
+    )
+
+
+def index_output(t):
+    props = __data.get("properties", {})
+    yield "<h2>"
+    yield q(t("Output"))
+    if props.get("pass"):
+        yield f' {q(t("bypassed"))}'
+    yield "</h2>"
+    yield kv(t, t("Power"), t.number(props.get("outputHomePower"), "W"))
+    yield kv(
+        t,
+        t("Bypass"),
+        enum(t, props.get("passMode"), t("Auto"), t("Off"), t("On")),
+        setting="pass-mode",
+    )
+    yield kv(
+        t,
+        t("Reset bypass to auto after one day"),
+        enum(t, props.get("autoRecover"), t("Off"), t("On")),
+        setting="auto-recover",
+    )
+    yield kv(
+        t,
+        t("Maximum inverter power"),
+        t.number(props.get("inverseMaxPower"), "W"),
+        enum(t, props.get("pvBrand"), t("Other"), *pvBrands),
+        setting="inverse",
+    )
+    yield kv(
+        t,
+        t("Maximum power"),
+        t.number(props.get("outputLimit"), "W"),
+        t("auto") if __auto_power_limit else None,
+        setting="output-limit",
+    )
+    if __auto_power_limit:
+        yield "<h3"
+        if not __auto_power_info_active:
+            yield ' class="line-through"'
+        yield f'>{q(t("Automatic"))}</h3>'
+        yield "<div"
+        if not __auto_power_info_active:
+            yield ' class="inactive"'
+            yield ' aria-hidden="true"'
+        yield ">"
         yield kv(
-            t("Automatic shutdown"),
-            enum(props.get("hubState"), t("Off"), t("On")),
-            setting="hub-state",
+            t,
+            t("Electricity meter"),
+            f'<a href="{q(config.METER_ENDPOINT)}"'
+            + f">{q(config.METER_ENDPOINT)}</a>",
+            q(config.METER_POWER_FIELD),
+            raw_value=True,
         )
-        yield "<h2>"
-        yield q(t("Output"))
-        if props.get("pass"):
-            yield f' {q(t("bypassed"))}'
-        yield "</h2>"
-        yield kv(t("Power"), t.number(props.get("outputHomePower"), "W"))
+        yield kv(t, t("Power import"), t.number(__auto_power_info_incoming, "W"))
         yield kv(
-            t("Bypass"),
-            enum(props.get("passMode"), t("Auto"), t("Off"), t("On")),
-            setting="pass-mode",
+            t, t("Total power consumption"), t.number(__auto_power_info_total, "W")
         )
+        yield kv(t, t("Remaining at limit"), t.number(__auto_power_info_remaining, "W"))
         yield kv(
-            t("Reset bypass to auto after one day"),
-            enum(props.get("autoRecover"), t("Off"), t("On")),
-            setting="auto-recover",
+            t,
+            t("Target range"),
+            t.number_range(
+                config.POWER_LOWER_LIMIT,
+                config.POWER_UPPER_LIMIT,
+                "W",
+            ),
         )
         yield kv(
-            t("Maximum inverter power"),
-            t.number(props.get("inverseMaxPower"), "W"),
-            enum(props.get("pvBrand"), t("Other"), *pvBrands),
-            setting="inverse",
+            t,
+            t("New limit"),
+            t.number(__auto_power_info_new_limit, "W"),
+            class_name="line-through" if __auto_power_info_skip else None,
         )
         yield kv(
-            t("Maximum power"),
-            t.number(props.get("outputLimit"), "W"),
-            t("auto") if __auto_power_limit else None,
-            setting="output-limit",
+            t,
+            t("Polling interval"),
+            t.number(__control_stats["period"], "s", 0, 1000),
         )
-        if __auto_power_limit:
-            yield "<h3"
-            if not __auto_power_info_active:
-                yield ' class="line-through"'
-            yield f'>{q(t("Automatic"))}</h3>'
-            yield "<div"
-            if not __auto_power_info_active:
-                yield ' class="inactive"'
-                yield ' aria-hidden="true"'
-            yield ">"
-            yield kv(
-                t("Electricity meter"),
-                f'<a href="{q(config.METER_ENDPOINT)}"'
-                + f">{q(config.METER_ENDPOINT)}</a>",
-                q(config.METER_POWER_FIELD),
-                raw_value=True,
-            )
-            yield kv(t("Power import"), t.number(__auto_power_info_incoming, "W"))
-            yield kv(
-                t("Total power consumption"), t.number(__auto_power_info_total, "W")
-            )
-            yield kv(
-                t("Remaining at limit"), t.number(__auto_power_info_remaining, "W")
-            )
-            yield kv(
-                t("Target range"),
-                t.number_range(
-                    config.POWER_LOWER_LIMIT,
-                    config.POWER_UPPER_LIMIT,
-                    "W",
-                ),
-            )
-            yield kv(
-                t("New limit"),
-                t.number(__auto_power_info_new_limit, "W"),
-                class_name="line-through" if __auto_power_info_skip else None,
-            )
-            yield "</div>"
-        yield f'<h2>{q(t("Solar"))}</h2>'
-        yield kv(t("Total power"), t.number(props.get("solarInputPower"), "W"))
-        yield kv(t("Panel\u00a0{}", 1), t.number(props.get("solarPower1"), "W"))
-        yield kv(t("Panel\u00a0{}", 2), t.number(props.get("solarPower2"), "W"))
-        yield f'<h2>{q(t("Battery"))}</h2>'
-        yield kv(t("Charge level"), t.number(props.get("electricLevel"), "%"))
+        yield kv(t, t("Load volatility"), t.number(__control_stats["volatility"], "W"))
+        yield "</div>"
+
+
+def index_solar(t):
+    props = __data.get("properties", {})
+    yield f'<h2>{q(t("Solar"))}</h2>'
+    yield kv(t, t("Total power"), t.number(props.get("solarInputPower"), "W"))
+    yield kv(t, t("Panel\u00a0{}", 1), t.number(props.get("solarPower1"), "W"))
+    yield kv(t, t("Panel\u00a0{}", 2), t.number(props.get("solarPower2"), "W"))
+
+
+def index_battery(t):
+    props = __data.get("properties", {})
+    packs = __data.get("packData", [])
+    yield f'<h2>{q(t("Battery"))}</h2>'
+    yield kv(t, t("Charge level"), t.number(props.get("electricLevel"), "%"))
+    yield kv(
+        t,
+        t("Minimum charge level"),
+        t.number(props.get("minSoc"), "%", div=10),
+        setting="min-soc",
+    )
+    yield kv(
+        t,
+        t("Maximum charge level"),
+        t.number(props.get("socSet"), "%", div=10),
+        setting="soc-set",
+    )
+    value = normalize_time(props.get("remainInputTime"))
+    yield kv(
+        t,
+        t("Charging power"),
+        t.number(props.get("outputPackPower"), "W"),
+        t.minutes(value) if value is not None else None,
+    )
+    value = normalize_time(props.get("remainOutTime"))
+    yield kv(
+        t,
+        t("Discharging power"),
+        t.number(props.get("packInputPower"), "W"),
+        t.minutes(value) if value is not None else None,
+    )
+    for i, pack in enumerate(packs):
+        yield f'<h3>{q(t("Pack\u00a0{}", i + 1))}</h3>'
+        yield kv(t, t("Serial number"), pack.get("sn"))
+        yield kv(t, t("Software version"), pack.get("softVersion"))
         yield kv(
-            t("Minimum charge level"),
-            t.number(props.get("minSoc"), "%", div=10),
-            setting="min-soc",
+            t,
+            t("Power"),
+            t.number(pack.get("power"), "W"),
+            enum(
+                t,
+                pack.get("state"),
+                t("inactive"),
+                t("charging"),
+                t("discharging"),
+            ),
         )
+        yield kv(t, t("Charge level"), t.number(pack.get("socLevel"), "%"))
         yield kv(
-            t("Maximum charge level"),
-            t.number(props.get("socSet"), "%", div=10),
-            setting="soc-set",
+            t,
+            t("Maximum temperature"),
+            t.number(normalize_temp(pack.get("maxTemp")), "°C"),
         )
-        value = normalize_time(props.get("remainInputTime"))
-        yield kv(
-            t("Charging power"),
-            t.number(props.get("outputPackPower"), "W"),
-            t.minutes(value) if value is not None else None,
+        yield kv(t, t("State of health"), t.number(pack.get("soh"), "%", div=10))
+
+
+INDEX_SECTIONS = (
+    ("status", index_status),
+    ("diagram", index_diagram),
+    ("hub", index_hub),
+    ("output", index_output),
+    ("solar", index_solar),
+    ("battery", index_battery),
+)
+
+
+def index_page(t):
+    title = t("Solar")
+    yield from html_header_stream(t, title)
+    if config.REFRESH_WEBPAGE:
+        yield (
+            f'<script src="{__static_urls["refresh.js"]}"'
+            + f' data-refresh-interval="{config.REFRESH_WEBPAGE * 1000:.0f}"'
+            + " defer></script>"
         )
-        value = normalize_time(props.get("remainOutTime"))
-        yield kv(
-            t("Discharging power"),
-            t.number(props.get("packInputPower"), "W"),
-            t.minutes(value) if value is not None else None,
+    yield f"<h1>{q(title)}</h1>"
+    for name, section in INDEX_SECTIONS:
+        yield f'<div id="{name}">'
+        yield from section(t)
+        yield "</div>"
+
+
+@app.get("/")
+def index(request):
+    if config.CLIENT_RENDERING:
+        return Response.send_file(
+            "static/app.html.gz",
+            content_type="text/html; charset=utf-8",
+            compressed=True,
+            max_age=24 * 60 * 60,
         )
-        for i, pack in enumerate(packs):
-            yield f'<h3>{q(t("Pack\u00a0{}", i + 1))}</h3>'
-            yield kv(t("Serial number"), pack.get("sn"))
-            yield kv(t("Software version"), pack.get("softVersion"))
-            yield kv(
-                t("Power"),
-                t.number(pack.get("power"), "W"),
-                enum(
-                    pack.get("state"),
-                    t("inactive"),
-                    t("charging"),
-                    t("discharging"),
-                ),
-            )
-            yield kv(t("Charge level"), t.number(pack.get("socLevel"), "%"))
-            yield kv(
-                t("Maximum temperature"),
-                t.number(normalize_temp(pack.get("maxTemp")), "°C"),
+    t = get_translation(request)
+    tag = etag(t.lang)
+    response = not_modified(request, tag)
+    if response:
+        return response
+    body = None
+    if tag is not None:
+        cached = __render_cache.get(t.lang)
+        if cached:
+            body = cached
+        else:
+            body = b"".join(
+                chunk if isinstance(chunk, bytes) else chunk.encode()
+                for chunk in index_page(t)
             )
-            yield kv(t("State of health"), t.number(pack.get("soh"), "%", div=10))
-
-    return Response(
-        body=stream(get_translation(request)),
-        status_code=200,
-        headers={"Content-Type": "text/html; charset=utf-8"},
+            if gc.mem_free() >= RENDER_CACHE_MIN_FREE:
+                __render_cache[t.lang] = body
+            else:
+                __render_cache.clear()
+    headers = cache_headers(
+        tag, {"Content-Type": "text/html; charset=utf-8", "Vary": "Accept-Language"}
     )
+    if body and config.COMPRESS_RESPONSES and len(body) >= COMPRESS_MIN_SIZE:
+        format = accepted_format(request.headers.get("Accept-Encoding", ""))
+        if format is not None:
+            # Compressed once per language and format like the page itself
+            key = f"{t.lang}/{format}"
+            compressed = __render_cache.get(key)
+            if compressed is None:
+                compressed = compress_bytes(body, format)
+                if t.lang in __render_cache:
+                    __render_cache[key] = compressed
+            body = compressed
+            headers["Vary"] = "Accept-Language, Accept-Encoding"
+            set_content_encoding(headers, format)
+    return Response(body=body or index_page(t), status_code=200, headers=headers)
+
+
+def index_sections(t):
+    """Rendered index sections and their hashes, shared by all clients"""
+    key = f"{t.lang}/sections"
+    sections = __render_cache.get(key)
+    if sections is None:
+        sections = {}
+        for name, section in INDEX_SECTIONS:
+            html = "".join(section(t))
+            sections[name] = (html, hash(html))
+        # Restored data is rendered with its age
+        if __snapshot_time is None and gc.mem_free() >= RENDER_CACHE_MIN_FREE:
+            __render_cache[key] = sections
+    return sections
+
+
+@app.get("/events")
+@with_sse
+async def events(request, sse):
+    t = get_translation(request)
+    hashes = {}
+    while True:
+        event = __change_event
+        changed = {}
+        for name, (html, digest) in index_sections(t).items():
+            if hashes.get(name) != digest:
+                hashes[name] = digest
+                changed[name] = html
+        if changed:
+            await sse.send(changed)
+        del changed
+        try:
+            await asyncio.wait_for(event.wait(), 30)
+        except asyncio.TimeoutError:
+            # Detect closed connections
+            await sse.send("", event="ping")
+            continue
+        # Coalesce bursts of notifications
+        await asyncio.sleep(1)
 
 
 @app.get("/settings/output-limit")
 def output_limit(request):
     async def stream(t):
         props = __data.get("properties", {})
-        title = f"{t("Solar")} - {t("Settings")}"
-        yield from html_header_stream(t, title)
-        yield f"<h1>{q(title)}</h1>"
-        yield '<form method="POST" action="/settings/output-limit">'
-        yield "<label>"
-        yield f'<h2>{q(t("Maximum power"))}</h2>'
+        yield __html_fragments[t.lang]["settings/output-limit"]
         yield '<input type="number" name="limit" required step="1" min="0"'
         value = props.get("inverseMaxPower")
         if value is not None:
@@ -727,17 +1349,9 @@ def output_limit(request):
         )
         yield f' onChange="{q(js)}"'
         yield f' value="{q(props.get("outputLimit", ""))}"></label>'
-        yield '<button type="submit" name="mode" value="manual">'
-        yield q(t("Apply"))
-        yield "</button>"
-        yield f'<button type="reset">{q(t("Reset"))}</button>'
-        yield "</form>"
+        yield __html_fragments[t.lang]["output-limit-footer"]
         if __meter_available:
-            yield '<form method="POST" action="/settings/output-limit">'
-            yield '<button type="submit" name="mode" value="auto">'
-            yield q(t("Auto"))
-            yield "</button>"
-            yield "</form>"
+            yield __html_fragments[t.lang]["output-limit-auto"]
 
     return Response(
         body=stream(get_translation(request)),
@@ -748,25 +1362,16 @@ def output_limit(request):
 
 @app.post("/settings/output-limit")
 def output_limit_set(request):
-    global __auto_power_limit
     try:
         mode = request.form["mode"]
         if mode != "auto" and mode != "manual":
             raise ValueError("invalid mode")
         if mode == "auto":
-            if not __meter_available:
-                raise ValueError("meter not available")
-            if not __auto_power_limit:
-                open("auto-power-limit", "a").close()
-                __auto_power_limit = True
+            set_auto_power_limit(True)
             return redirect("/")
-        limit = int(request.form["limit"])
-        if limit < 0:
-            raise ValueError("limit must be >= 0")
-        if __auto_power_limit:
-            os.remove("auto-power-limit")
-            __auto_power_limit = False
-        asyncio.create_task(ble_set_output_power_limit(limit))
+        properties = validate_properties({"outputLimit": int(request.form["limit"])})
+        set_auto_power_limit(False)
+        ble_write(properties)
     except MemoryError:
         raise
     except Exception as e:
@@ -775,26 +1380,43 @@ def output_limit_set(request):
     return redirect("/")
 
 
-@app.get("/settings/min-soc")
-def min_soc(request):
+@app.get("/settings/<name>")
+def settings(request, name):
+    fields = SETTINGS.get(name)
+    if fields is None:
+        return "Not found", 404
+
     async def stream(t):
         props = __data.get("properties", {})
-        title = f"{t("Solar")} - {t("Settings")}"
-        yield from html_header_stream(t, title)
-        yield f"<h1>{q(title)}</h1>"
-        yield '<form method="POST" action="/settings/min-soc">'
-        yield "<label>"
-        yield f'<h2>{q(t("Minimum charge level"))}</h2>'
-        yield '<input type="number" name="value" required min="0" max="50"'
-        value = props.get("minSoc")
-        if value is not None:
-            value = value // 10
-        else:
-            value = ""
-        yield f' value="{q(value)}"></label>'
-        yield f'<button type="submit">{q(t("Apply"))}</button>'
-        yield f'<button type="reset">{q(t("Reset"))}</button>'
-        yield "</form>"
+        yield __html_fragments[t.lang][f"settings/{name}"]
+        for i, (field, key, heading, input_type, options) in enumerate(fields):
+            if i:
+                yield f"<label><h2>{q(t(heading))}</h2>"
+            value = props.get(key)
+            if input_type == "number":
+                minimum, maximum, step, factor = PROPERTY_RULES[key]
+                yield f'<input type="number" name="{field}" required'
+                if step != 1:
+                    yield f' step="{step}"'
+                yield f' min="{minimum}" max="{maximum}"'
+                value = "" if value is None else value // factor
+                yield f' value="{q(value)}"></label>'
+            elif input_type == "radio":
+                for option, label in options:
+                    checked = " checked" if value == option else ""
+                    yield f'<label><input type="radio" name="{field}" required'
+                    yield f'{checked} value="{q(option)}">{q(t(label))}</label>'
+            else:
+                yield f'<select name="{field}" required>'
+                if value is None:
+                    yield f'<option value="" selected>{q(t.no_value)}</option>'
+                for option, label in options:
+                    yield f"<option value={q(option)}"
+                    if value == option:
+                        yield " selected"
+                    yield f">{q(t(label))}</option>"
+                yield "</select></label>"
+        yield __html_fragments[t.lang]["settings-footer"]
 
     return Response(
         body=stream(get_translation(request)),
@@ -803,13 +1425,14 @@ def min_soc(request):
     )
 
 
-@app.post("/settings/min-soc")
-def min_soc_set(request):
+@app.post("/settings/<name>")
+def settings_set(request, name):
+    fields = SETTINGS.get(name)
+    if fields is None:
+        return "Not found", 404
     try:
-        value = int(request.form["value"])
-        if value < 0 or value > 50:
-            raise ValueError("value must be >= 0 and <= 50")
-        asyncio.create_task(ble_send("write", properties={"minSoc": value * 10}))
+        properties = {key: int(request.form[field]) for field, key, *_ in fields}
+        ble_write(validate_properties(properties))
     except MemoryError:
         raise
     except Exception as e:
@@ -818,299 +1441,246 @@ def min_soc_set(request):
     return redirect("/")
 
 
-@app.get("/settings/soc-set")
-def soc_set(request):
-    async def stream(t):
-        props = __data.get("properties", {})
-        title = f"{t("Solar")} - {t("Settings")}"
-        yield from html_header_stream(t, title)
-        yield f"<h1>{q(title)}</h1>"
-        yield '<form method="POST" action="/settings/soc-set">'
-        yield "<label>"
-        yield f'<h2>{q(t("Maximum charge level"))}</h2>'
-        yield '<input type="number" name="value" required min="70" max="100"'
-        value = props.get("socSet")
-        if value is not None:
-            value = value // 10
-        else:
-            value = ""
-        yield f' value="{q(value)}"></label>'
-        yield f'<button type="submit">{q(t("Apply"))}</button>'
-        yield f'<button type="reset">{q(t("Reset"))}</button>'
-        yield "</form>"
-
-    return Response(
-        body=stream(get_translation(request)),
-        status_code=200,
-        headers={"Content-Type": "text/html; charset=utf-8"},
-    )
-
-
-@app.post("/settings/soc-set")
-def soc_set_set(request):
+@app.post("/api/properties")
+def api_properties(request):
     try:
-        value = int(request.form["value"])
-        if value < 70 or value > 100:
-            raise ValueError("value must be >= 70 and <= 100")
-        asyncio.create_task(ble_send("write", properties={"socSet": value * 10}))
+        properties = request.json
+        if not isinstance(properties, dict):
+            raise ValueError("expected a JSON object")
+        values = validate_properties(properties)
+        if "outputLimit" in values:
+            set_auto_power_limit(False)
+        ble_write(values)
     except MemoryError:
         raise
     except Exception as e:
         sys.print_exception(e)
-        return html_error(get_translation(request), e)
-    return redirect("/")
-
-
-@app.get("/settings/hub-state")
-def hub_state(request):
-    async def stream(t):
-        props = __data.get("properties", {})
-        title = f"{t("Solar")} - {t("Settings")}"
-        yield from html_header_stream(t, title)
-        yield f"<h1>{q(title)}</h1>"
-        yield '<form method="POST" action="/settings/hub-state">'
-        yield f'<h2>{q(t("Automatic shutdown"))}</h2>'
-        for value, label in [[1, t("On")], [0, t("Off")]]:
-            yield '<label><input type="radio" name="value" required'
-            if props.get("hubState") == value:
-                yield " checked"
-            yield f' value="{q(value)}">{q(label)}</label>'
-        yield f'<button type="submit">{q(t("Apply"))}</button>'
-        yield f'<button type="reset">{q(t("Reset"))}</button>'
-        yield "</form>"
-
-    return Response(
-        body=stream(get_translation(request)),
-        status_code=200,
-        headers={"Content-Type": "text/html; charset=utf-8"},
-    )
+        return {"error": str(e)}, 400
+    return {"properties": properties}, 202
 
 
-@app.post("/settings/hub-state")
-def hub_state_set(request):
+@app.post("/api/meter")
+def api_meter(request):
+    global __meter_push_data, __meter_push_ticks
+    if not __meter_available:
+        return {"error": "meter not configured"}, 404
     try:
-        value = int(request.form["value"])
-        if value != 0 and value != 1:
-            raise ValueError("value must be 0 or 1")
-        asyncio.create_task(ble_send("write", properties={"hubState": value}))
+        __meter_push_data = check_meter_data(__meter_push_fields.scan(request.body))
     except MemoryError:
         raise
     except Exception as e:
         sys.print_exception(e)
-        return html_error(get_translation(request), e)
-    return redirect("/")
+        return {"error": str(e)}, 400
+    __meter_push_ticks = time.ticks_ms()
+    __control_stats["pushes"] += 1
+    __meter_pushed.set()
+    return "", 204
 
 
-@app.get("/settings/pass-mode")
-def pass_mode(request):
-    async def stream(t):
-        props = __data.get("properties", {})
-        title = f"{t("Solar")} - {t("Settings")}"
-        yield from html_header_stream(t, title)
-        yield f"<h1>{q(title)}</h1>"
-        yield '<form method="POST" action="/settings/pass-mode">'
-        yield f'<h2>{q(t("Bypass"))}</h2>'
-        for value, label in [[0, t("Auto")], [2, t("On")], [1, t("Off")]]:
-            yield '<label><input type="radio" name="value" required'
-            if props.get("passMode") == value:
-                yield " checked"
-            yield f' value="{q(value)}">{q(label)}</label>'
-        yield f'<button type="submit">{q(t("Apply"))}</button>'
-        yield f'<button type="reset">{q(t("Reset"))}</button>'
-        yield "</form>"
-
+@app.get("/data")
+def data(request):
+    if not __ble_write_char and __snapshot_time is None:
+        return "No Data", 503
+    full = bool(request.args.get("full"))
+    tag = etag("full") if full else etag()
+    response = not_modified(request, tag)
+    if response:
+        return response
+    props = __data.get("properties", {})
+    result = {
+        "stale": __snapshot_time is not None,
+        "staleAge": snapshot_age(),
+        "batteryLevel": props.get("electricLevel"),
+        "batteryChargePower": props.get("outputPackPower"),
+        "batteryDischargePower": props.get("packInputPower"),
+        "solarPower": props.get("solarInputPower"),
+        "outputPower": props.get("outputHomePower"),
+        "outputPowerLimit": props.get("outputLimit"),
+        "autoOutputPowerLimit": __auto_power_limit,
+        "bypass": (bool(props["pass"]) if props.get("pass") is not None else None),
+    }
+    if full:
+        # State of the dashboard for rendering in the browser
+        result["connected"] = bool(__ble_write_char)
+        result["deviceSn"] = __data.get("deviceSn")
+        result["properties"] = {key: props.get(key) for key in HUB_PROPERTIES}
+        result["packData"] = [
+            {key: pack.get(key) for key in ("sn",) + PACK_PROPERTIES}
+            for pack in __data.get("packData", [])
+        ]
+        result["meter"] = None
+        if __meter_available:
+            result["meter"] = {
+                "endpoint": config.METER_ENDPOINT,
+                "field": config.METER_POWER_FIELD,
+                "power": __auto_power_info_data.get(config.METER_POWER_DISPLAY_FIELD),
+            }
+        result["autoPowerInfo"] = {
+            "active": __auto_power_info_active,
+            "incoming": __auto_power_info_incoming,
+            "total": __auto_power_info_total,
+            "remaining": __auto_power_info_remaining,
+            "lowerLimit": config.POWER_LOWER_LIMIT,
+            "upperLimit": config.POWER_UPPER_LIMIT,
+            "newLimit": __auto_power_info_new_limit,
+            "skip": __auto_power_info_skip,
+            "period": __control_stats["period"],
+            "volatility": __control_stats["volatility"],
+        }
     return Response(
-        body=stream(get_translation(request)),
+        body=encode(result),
         status_code=200,
-        headers={"Content-Type": "text/html; charset=utf-8"},
+        headers=cache_headers(tag, {"Content-Type": "application/json; charset=UTF-8"}),
     )
 
 
-@app.post("/settings/pass-mode")
-def pass_mode_set(request):
-    try:
-        value = int(request.form["value"])
-        if value != 0 and value != 1 and value != 2:
-            raise ValueError("value must be 0, 1 or 2")
-        asyncio.create_task(ble_send("write", properties={"passMode": value}))
-    except MemoryError:
-        raise
-    except Exception as e:
-        sys.print_exception(e)
-        return html_error(get_translation(request), e)
-    return redirect("/")
-
-
-@app.get("/settings/buzzer-switch")
-def buzzer_switch(request):
-    async def stream(t):
-        props = __data.get("properties", {})
-        title = f"{t("Solar")} - {t("Settings")}"
-        yield from html_header_stream(t, title)
-        yield f"<h1>{q(title)}</h1>"
-        yield '<form method="POST" action="/settings/buzzer-switch">'
-        yield f'<h2>{q(t("Buzzer"))}</h2>'
-        for value, label in [[1, t("On")], [0, t("Off")]]:
-            yield '<label><input type="radio" name="value" required'
-            if props.get("buzzerSwitch") == value:
-                yield " checked"
-            yield f' value="{q(value)}">{q(label)}</label>'
-        yield f'<button type="submit">{q(t("Apply"))}</button>'
-        yield f'<button type="reset">{q(t("Reset"))}</button>'
-        yield "</form>"
-
-    return Response(
-        body=stream(get_translation(request)),
-        status_code=200,
-        headers={"Content-Type": "text/html; charset=utf-8"},
+@app.get("/translations.json")
+def translations(request):
+    t = get_translation(request)
+    return (
+        {
+            "lang": t.lang,
+            "noValue": t.no_value,
+            "decimalSeparator": t.decimal_seperator,
+            "thousandsSeparator": t.thousands_seperator,
+            "strings": {s: t(s, raw=True) for s in t.strings},
+            "pvBrands": pvBrands,
+            "refreshInterval": config.REFRESH_WEBPAGE * 1000,
+        },
+        200,
+        {"Cache-Control": f"max-age={24 * 60 * 60}", "Vary": "Accept-Language"},
     )
 
 
-@app.post("/settings/buzzer-switch")
-def buzzer_switch_set(request):
-    try:
-        value = int(request.form["value"])
-        if value != 0 and value != 1:
-            raise ValueError("value must be 0 or 1")
-        asyncio.create_task(ble_send("write", properties={"buzzerSwitch": value}))
-    except MemoryError:
-        raise
-    except Exception as e:
-        sys.print_exception(e)
-        return html_error(get_translation(request), e)
-    return redirect("/")
+def data_changes(since):
+    """Parts of __data that changed after revision `since`"""
+    changes = {key: __data[key] for key, rev in __data_revisions.items() if rev > since}
+    if "data" in __data:
+        items = [
+            item for item, rev in zip(__data_ring, __data_ring_revisions) if rev > since
+        ]
+        if items:
+            changes["data"] = items
+    if "properties" in __data and __data_properties.revision > since:
+        changes["properties"] = dict(__data_properties.changed(since))
+    if "packData" in __data:
+        packs = []
+        for sn, properties in __data_packs.changed(since):
+            pack = dict(properties)
+            pack["sn"] = sn
+            packs.append(pack)
+        if packs:
+            changes["packData"] = packs
+    return changes
 
 
-@app.get("/settings/auto-recover")
-def auto_recover(request):
-    async def stream(t):
-        props = __data.get("properties", {})
-        title = f"{t("Solar")} - {t("Settings")}"
-        yield from html_header_stream(t, title)
-        yield f"<h1>{q(title)}</h1>"
-        yield '<form method="POST" action="/settings/auto-recover">'
-        yield f'<h2>{q(t("Reset bypass to auto after one day"))}</h2>'
-        for value, label in [[1, t("On")], [0, t("Off")]]:
-            yield '<label><input type="radio" name="value" required'
-            if props.get("autoRecover") == value:
-                yield " checked"
-            yield f' value="{q(value)}">{q(label)}</label>'
-        yield f'<button type="submit">{q(t("Apply"))}</button>'
-        yield f'<button type="reset">{q(t("Reset"))}</button>'
-        yield "</form>"
-
-    return Response(
-        body=stream(get_translation(request)),
+@app.get("/raw-data")
+def raw_data(request):
+    since = request.args.get("since")
+    if since is not None:
+        # Revisions are only comparable within the same boot and since the
+        # last reset of __data, otherwise the client gets everything again
+        boot_id, *rev = since.split("-", 1)
+        try:
+            rev = int(rev[0]) if rev else -1
+        except ValueError:
+            rev = -1
+        full = (
+            boot_id != __boot_id
+            or not __reset_revision <= rev <= __revision
+            # Items the client didn't get yet were dropped from the ring
+            or __data_evicted_revision > rev
+        )
+        return Response(
+            body=encode(
+                {
+                    "revision": f"{__boot_id}-{__revision}",
+                    "full": full,
+                    "data": __data if full else data_changes(rev),
+                }
+            ),
+            status_code=200,
+            headers={"Content-Type": "application/json; charset=UTF-8"},
+        )
+    tag = etag()
+    return not_modified(request, tag) or Response(
+        body=encode(__data),
         status_code=200,
-        headers={"Content-Type": "text/html; charset=utf-8"},
+        headers=cache_headers(tag, {"Content-Type": "application/json; charset=UTF-8"}),
     )
 
 
-@app.post("/settings/auto-recover")
-def auto_recover_set(request):
+@app.get("/history")
+def history(request):
     try:
-        value = int(request.form["value"])
-        if value != 0 and value != 1:
-            raise ValueError("value must be 0 or 1")
-        asyncio.create_task(ble_send("write", properties={"autoRecover": value}))
+        resolution, start, end, range_ = (
+            int(request.args[name]) if request.args.get(name) else None
+            for name in ("resolution", "start", "end", "range")
+        )
+        if range_ is not None:
+            start = int(time.time()) - range_
+        series = __history.select(resolution, start)
     except MemoryError:
         raise
     except Exception as e:
-        sys.print_exception(e)
-        return html_error(get_translation(request), e)
-    return redirect("/")
-
-
-@app.get("/settings/inverse")
-def inverse(request):
-    async def stream(t):
-        props = __data.get("properties", {})
-        title = f"{t("Solar")} - {t("Settings")}"
-        yield from html_header_stream(t, title)
-        yield f"<h1>{q(title)}</h1>"
-        yield '<form method="POST" action="/settings/inverse">'
-        yield "<label>"
-        yield f'<h2>{q(t("Maximum inverter power"))}</h2>'
-        yield '<input type="number" name="limit" required'
-        yield ' step="100" min="100" max="1200"'
-        yield f' value="{q(props.get("inverseMaxPower", ""))}"></label>'
-        yield "<label>"
-        yield f'<h2>{q(t("Inverter manufacturer"))}</h2>'
-        yield '<select name="brand" required>'
-        if props.get("pvBrand") is None:
-            yield f'<option value="" selected>{t.no_value}</option>'
-        options = [t("Other")]
-        options.extend(pvBrands)
-        for value, label in enumerate(options):
-            yield f"<option value={q(value)}"
-            if value == props.get("pvBrand"):
-                yield " selected"
-            yield f">{q(label)}</option>"
-        yield "</select></label>"
-        yield f'<button type="submit">{q(t("Apply"))}</button>'
-        yield f'<button type="reset">{q(t("Reset"))}</button>'
-        yield "</form>"
+        return str(e), 400
+
+    async def stream():
+        yield f'{{"resolution": {series.resolution}, '
+        yield f'"channels": {json.dumps(HISTORY_CHANNELS)}, "samples": ['
+        for n, (timestamp, values) in enumerate(__history.rows(series, start, end)):
+            yield ", [" if n else "["
+            yield str(timestamp)
+            for value in values:
+                yield f", {json.dumps(value)}"
+            yield "]"
+        yield "]}"
 
     return Response(
-        body=stream(get_translation(request)),
+        body=stream(),
         status_code=200,
-        headers={"Content-Type": "text/html; charset=utf-8"},
+        headers={"Content-Type": "application/json; charset=UTF-8"},
     )
 
 
-@app.post("/settings/inverse")
-def inverse_set(request):
-    try:
-        limit = int(request.form["limit"])
-        if limit < 100 or limit > 1200:
-            raise ValueError("limit must be >= 100 and <= 1200")
-        if limit % 100:
-            raise ValueError("limit must be multiple 100")
-        brand = int(request.form["brand"])
-        if brand < 0 or brand > len(pvBrands):
-            raise ValueError(f"limit must be >= 0 and <= {len(pvBrands)}")
-        asyncio.create_task(
-            ble_send("write", properties={"pvBrand": brand, "inverseMaxPower": limit})
-        )
-    except MemoryError:
-        raise
-    except Exception as e:
-        sys.print_exception(e)
-        return html_error(get_translation(request), e)
-    return redirect("/")
-
-
-@app.get("/data")
-def data(request):
-    if not __ble_write_char:
-        return "No Data", 503
-    props = __data.get("properties", {})
+@app.get("/stats")
+def stats(request):
     return {
-        "batteryLevel": props.get("electricLevel"),
-        "batteryChargePower": props.get("outputPackPower"),
-        "batteryDischargePower": props.get("packInputPower"),
-        "solarPower": props.get("solarInputPower"),
-        "outputPower": props.get("outputHomePower"),
-        "outputPowerLimit": props.get("outputLimit"),
-        "autoOutputPowerLimit": __auto_power_limit,
-        "bypass": (bool(props["pass"]) if props.get("pass") is not None else None),
+        "data": {
+            "capacity": __data_ring.capacity,
+            "length": len(__data_ring),
+            "evicted": __data_ring.evicted,
+        },
+        "commands": __commands.stats(),
+        "control": __control_stats,
+        "meter": __meter_client.stats() if __meter_client else None,
+        "notifications": {
+            "fragmented": __ble_messages.fragmented,
+            "dropped": __ble_messages.dropped,
+        },
     }
 
 
-@app.get("/raw-data")
-def raw_data(request):
-    return __data
-
-
+if config.SIMULATION:
+    sim.start()
+try:
+    load_snapshot()
+except MemoryError:
+    raise
+except Exception as e:
+    sys.print_exception(e)
 __wdt_monitors.extend(
     [
         (asyncio.create_task(ble_task()).done, 0),
+        (asyncio.create_task(__commands.run(ble_send, __data_properties.get)).done, 0),
         (asyncio.create_task(power_task()).done, 0),
         (asyncio.create_task(get_info_task()).done, 0),
         (asyncio.create_task(watchdog_task()).done, 0),
         (asyncio.create_task(wifi_task()).done, 0),
+        (asyncio.create_task(__history_log.run()).done, 0),
+        (asyncio.create_task(snapshot_task()).done, 0),
         (lambda: not __nic.isconnected(), 600_000),
         (lambda: __ble_write_char is None, 600_000),
     ]
 )
-app.run(port=80)
+app.run(port=config.HTTP_PORT)
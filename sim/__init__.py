@@ -0,0 +1,18 @@
+"""Host-side stand-ins for the hardware used by main.py
+
+Enable with `SIMULATION = True` in `config.py` to run the web interface with
+unix MicroPython against a simulated SolarFlow hub and electricity meter.
+"""
+
+import asyncio
+
+from sim.hubsim import Hub
+from sim.metersim import Meter
+
+hub = Hub()
+meter = Meter(hub)
+
+
+def start():
+    asyncio.create_task(hub.run())
+    asyncio.create_task(meter.serve())
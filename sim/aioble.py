@@ -0,0 +1,89 @@
+import asyncio
+import json
+
+import sim
+from sim.bluetooth import UUID
+
+ADDR_PUBLIC = 0
+
+SERVICE_ID = UUID(0xA002)
+NOTIFY_ID = UUID(0xC305)
+WRITE_ID = UUID(0xC304)
+
+
+class _Characteristic:
+    def __init__(self, connection, uuid):
+        self._connection = connection
+        self.uuid = uuid
+
+    async def notified(self, timeout_ms=None):
+        connection = self._connection
+        while not connection.queue:
+            connection.event.clear()
+            if timeout_ms is None:
+                await connection.event.wait()
+            else:
+                await asyncio.wait_for(connection.event.wait(), timeout_ms / 1000)
+        return connection.queue.pop(0)
+
+    async def write(self, data, response=False, timeout_ms=1000):
+        connection = self._connection
+        await asyncio.sleep(connection.latency)
+        msg = json.loads(data)
+        if msg.get("method") == "BLESPP_OK":
+            connection.ready = True
+        for reply in connection.hub.handle(msg):
+            connection.notify(reply)
+
+
+class _Service:
+    def __init__(self, connection, uuid):
+        self._connection = connection
+        self.uuid = uuid
+
+    async def characteristic(self, uuid):
+        return _Characteristic(self._connection, uuid)
+
+
+class _Connection:
+    latency = 0.05
+    fragment_size = None  # Split notifications like a small MTU
+
+    def __init__(self, hub):
+        self.hub = hub
+        self.queue = []
+        self.event = asyncio.Event()
+        self.ready = False
+
+    def notify(self, data):
+        size = self.fragment_size or len(data)
+        for offset in range(0, len(data), size):
+            self.queue.append(data[offset : offset + size])
+        self.event.set()
+
+    async def _handshake(self):
+        while self.hub.connection is self and not self.ready:
+            self.notify(self.hub.message("BLESPP"))
+            await asyncio.sleep(5)
+
+    async def services(self):
+        yield _Service(self, SERVICE_ID)
+
+    async def __aenter__(self):
+        self.hub.connection = self
+        asyncio.create_task(self._handshake())
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if self.hub.connection is self:
+            self.hub.connection = None
+
+
+class Device:
+    def __init__(self, addr_type, addr):
+        self.addr_type = addr_type
+        self.addr = addr
+
+    async def connect(self, timeout_ms=10000):
+        await asyncio.sleep(1)
+        return _Connection(sim.hub)
@@ -0,0 +1,91 @@
+"""Compression benchmark of responses with data of the simulated hub
+
+Run from the repository root with `micropython -m sim.bench_compress`.
+"""
+
+import gc
+import json
+import time
+
+from sim.hubsim import Hub
+from solar.compress import GZIP, compress
+from solar.jsonstream import encode
+from solar.ringbuf import RingBuffer
+from solar.store import (
+    HUB_PROPERTIES,
+    PACK_PROPERTIES,
+    PackList,
+    PropertyStore,
+    schema,
+)
+
+ROUNDS = 20
+
+
+def raw_data():
+    """Data of /raw-data after the hub reported for a while"""
+    hub = Hub()
+    data = {}
+    ring = RingBuffer(32)
+    properties = PropertyStore(schema(HUB_PROPERTIES))
+    packs = PackList(schema(PACK_PROPERTIES))
+    messages = list(hub.handle({"method": "getInfo"}))
+    messages.extend(hub.handle({"method": "read", "properties": ["getAll"]}))
+    for _ in range(40):
+        messages.append(hub.message("report", properties=hub.step(5)))
+    for message in messages:
+        msg = json.loads(message)
+        for key in ("deviceSn", "modules", "firmwares"):
+            if key in msg:
+                data[key] = msg[key]
+        if "properties" in msg:
+            data["properties"] = properties
+            properties.update(msg["properties"])
+            ring.append(msg["properties"])
+        if "packData" in msg:
+            data["packData"] = packs
+            packs.update(msg["packData"])
+    data["data"] = ring
+    return data
+
+
+def html():
+    """Markup like the pages rendered on the device"""
+    with open("static/app.html") as f:
+        return f.read()
+
+
+def timed(chunks):
+    """Microseconds, allocated and yielded bytes for one response"""
+    gc.collect()
+    allocated = gc.mem_alloc()
+    start = time.ticks_us()
+    size = 0
+    for _ in range(ROUNDS):
+        for chunk in chunks():
+            size += len(chunk)
+    elapsed = time.ticks_diff(time.ticks_us(), start)
+    allocated = gc.mem_alloc() - allocated
+    return elapsed // ROUNDS, allocated // ROUNDS, size // ROUNDS
+
+
+def measure(name, chunks):
+    elapsed, allocated, size = timed(chunks)
+    print(f"{name}: {size} bytes, {elapsed} us, ~{allocated} bytes allocated")
+    for wbits in (9, 10, 12):
+        elapsed, allocated, size = timed(lambda: compress(chunks(), GZIP, wbits))
+        print(
+            f"{name}, window {2 ** wbits} bytes: {size} bytes, {elapsed} us,"
+            + f" ~{allocated} bytes allocated"
+        )
+
+
+def main():
+    data = raw_data()
+    page = html()
+    print("per response (allocations are a lower bound, the GC may run)")
+    measure("/raw-data", lambda: encode(data))
+    measure("page", lambda: iter((page,)))
+
+
+main()
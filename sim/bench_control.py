@@ -0,0 +1,63 @@
+"""Energy benchmark of the automatic power limit for different periods
+
+Run from the repository root with `micropython -m sim.bench_control`.
+
+The simulated hub and meter are stepped in simulated seconds over the same
+seeded load profile for every period. New limits take effect immediately,
+the delays of BLE reports and of the inverter are not simulated.
+"""
+
+import random
+
+import config
+from sim.hubsim import Hub
+from sim.metersim import Meter
+from solar.control import power_limit
+
+SEED = 1
+START = 8 * 3600  # 8:00 UTC
+DURATION = 8 * 3600  # seconds
+PERIODS = (60, 30, 15, 5, 1)  # seconds
+
+
+def run(period):
+    random.seed(SEED)
+    hub = Hub()
+    meter = Meter(hub)
+    props = hub.properties
+    changes = 0
+    for second in range(DURATION):
+        now = START + second
+        hub.step(1, now)
+        meter.sample(now)
+        if second % period:
+            continue
+        _, _, new_limit, skip = power_limit(
+            meter.data()[config.METER_POWER_FIELD],
+            props["outputHomePower"],
+            props["outputLimit"],
+            props["inverseMaxPower"],
+            config.POWER_LOWER_LIMIT,
+            config.POWER_UPPER_LIMIT,
+        )
+        if not skip:
+            list(
+                hub.handle(
+                    {"method": "write", "properties": {"outputLimit": new_limit}}
+                )
+            )
+            changes += 1
+    return meter.import_energy, meter.export_energy, changes
+
+
+def main():
+    print(f"{DURATION // 3600} h from {START // 3600}:00 UTC, seed {SEED}")
+    for period in PERIODS:
+        imported, exported, changes = run(period)
+        print(
+            f"CONTROL_PERIOD = {period}: imported {imported:.1f} Wh,"
+            + f" exported {exported:.1f} Wh, {changes} limit changes"
+        )
+
+
+main()
@@ -0,0 +1,80 @@
+"""Ingest benchmark for BLE notifications of the simulated hub
+
+Run from the repository root with `micropython -m sim.bench_ingest`.
+"""
+
+import gc
+import time
+
+from sim.hubsim import Hub
+from solar.reassemble import Reassembler
+from solar.store import (
+    HUB_PROPERTIES,
+    PACK_PROPERTIES,
+    PackList,
+    PropertyStore,
+    schema,
+)
+
+ROUNDS = 200
+
+
+def recorded_messages():
+    hub = Hub()
+    messages = list(hub.handle({"method": "getInfo"}))
+    messages.extend(hub.handle({"method": "read", "properties": ["getAll"]}))
+    for _ in range(20):
+        messages.append(hub.message("report", properties=hub.step(5)))
+        messages.append(hub.message("report", packData=hub.packs))
+    messages.extend(hub.handle({"method": "write", "properties": {"minSoc": 200}}))
+    return messages
+
+
+def split(messages, size):
+    return [
+        message[offset : offset + size]
+        for message in messages
+        for offset in range(0, len(message), size or len(message))
+    ]
+
+
+def ingest(notifications, reassembler, properties, packs):
+    count = 0
+    for data in notifications:
+        msg = reassembler.feed(data)
+        if msg is None:
+            continue
+        count += 1
+        if "properties" in msg:
+            properties.update(msg["properties"], count)
+        if "packData" in msg:
+            packs.update(msg["packData"], count)
+    return count
+
+
+def main():
+    messages = recorded_messages()
+    reassembler = Reassembler()
+    properties = PropertyStore(schema(HUB_PROPERTIES))
+    packs = PackList(schema(PACK_PROPERTIES))
+    size = sum(len(message) for message in messages)
+    print(f"{len(messages)} messages, {size // len(messages)} bytes on average")
+    for fragment_size in (None, 180, 20):
+        notifications = split(messages, fragment_size)
+        gc.collect()
+        allocated = gc.mem_alloc()
+        start = time.ticks_ms()
+        count = 0
+        for _ in range(ROUNDS):
+            count += ingest(notifications, reassembler, properties, packs)
+        elapsed = time.ticks_diff(time.ticks_ms(), start)
+        allocated = gc.mem_alloc() - allocated
+        print(
+            f"fragment size {fragment_size or 'none'}:"
+            + f" {count * 1000 // max(1, elapsed)} messages/s,"
+            + f" ~{allocated // count} bytes allocated per message"
+            + " (lower bound, the GC may run)"
+        )
+
+
+main()
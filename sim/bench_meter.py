@@ -0,0 +1,40 @@
+"""Latency benchmark of meter requests against the simulated meter
+
+Run from the repository root with `micropython -m sim.bench_meter`.
+"""
+
+import asyncio
+import time
+
+import sim
+from solar.httpclient import HTTPClient
+
+REQUESTS = 100
+
+
+async def measure(client, keep_alive):
+    latencies = []
+    for _ in range(REQUESTS):
+        start = time.ticks_us()
+        await client.get(len)
+        latencies.append(time.ticks_diff(time.ticks_us(), start))
+        if not keep_alive:
+            client.close()
+    latencies.sort()
+    print(
+        f"{'keep-alive' if keep_alive else 'new connection'}:"
+        + f" median {latencies[len(latencies) // 2]} us,"
+        + f" max {latencies[-1]} us,"
+        + f" {client.connects} connections"
+    )
+
+
+async def main():
+    asyncio.create_task(sim.meter.serve())
+    await asyncio.sleep(1)
+    url = f"http://localhost:{sim.meter.port}/data"
+    await measure(HTTPClient(url), False)
+    await measure(HTTPClient(url), True)
+
+
+asyncio.run(main())
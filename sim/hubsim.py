@@ -0,0 +1,157 @@
+import asyncio
+import json
+import math
+import random
+import time
+
+import config
+
+
+class Hub:
+    """Simulated SolarFlow hub speaking the BLE JSON protocol"""
+
+    report_interval = 5
+
+    def __init__(self):
+        self.sn = "SIMHUB0000000001"
+        self.properties = {
+            "masterSoftVersion": 4113,
+            "electricLevel": 50,
+            "minSoc": 100,
+            "socSet": 1000,
+            "inverseMaxPower": 800,
+            "pvBrand": 1,
+            "outputLimit": 300,
+            "outputHomePower": 0,
+            "outputPackPower": 0,
+            "packInputPower": 0,
+            "packState": 0,
+            "solarInputPower": 0,
+            "solarPower1": 0,
+            "solarPower2": 0,
+            "remainInputTime": 59940,
+            "remainOutTime": 59940,
+            "pass": 0,
+            "passMode": 0,
+            "autoRecover": 0,
+            "buzzerSwitch": 0,
+            "hubState": 0,
+            "packNum": 2,
+        }
+        self.packs = [
+            {
+                "sn": f"SIMPACK000000000{i}",
+                "softVersion": 4101,
+                "power": 0,
+                "state": 0,
+                "socLevel": 50,
+                "maxTemp": 2931,
+                "soh": 1000,
+            }
+            for i in range(1, 3)
+        ]
+        self.capacity = 960 * len(self.packs)  # Wh
+        self.energy = self.capacity / 2
+        self.connection = None
+        self.output_power = 0
+
+    def _solar(self, now):
+        # Daylight between 6:00 and 20:00, clouds add noise
+        hour = (now % 86400) / 3600
+        if not 6 <= hour <= 20:
+            return 0, 0
+        peak = math.sin(math.pi * (hour - 6) / 14) * 400
+        return (
+            max(0, round(peak * random.uniform(0.7, 1))),
+            max(0, round(peak * random.uniform(0.7, 1))),
+        )
+
+    def step(self, dt, now=None):
+        props = self.properties
+        changed = {}
+
+        def update(key, value):
+            if props.get(key) != value:
+                props[key] = value
+                changed[key] = value
+
+        solar1, solar2 = self._solar(time.time() if now is None else now)
+        solar = solar1 + solar2
+        soc = self.energy * 100 / self.capacity
+        can_discharge = soc * 10 > props["minSoc"]
+        can_charge = soc * 10 < props["socSet"]
+        output = min(props["outputLimit"], props["inverseMaxPower"])
+        if not can_discharge:
+            output = min(output, solar)
+        battery = solar - output  # positive: charging
+        if battery > 0 and not can_charge:
+            battery = 0
+            output = min(solar, props["inverseMaxPower"])
+        self.energy = max(0, min(self.capacity, self.energy + battery * dt / 3600))
+        self.output_power = output
+        update("solarPower1", solar1)
+        update("solarPower2", solar2)
+        update("solarInputPower", solar)
+        update("outputHomePower", output)
+        update("outputPackPower", max(0, battery))
+        update("packInputPower", max(0, -battery))
+        update("packState", 1 if battery > 0 else 2 if battery < 0 else 0)
+        update("electricLevel", round(soc))
+        if battery > 0:
+            remaining = (self.capacity - self.energy) * 60 / battery
+        elif battery < 0:
+            remaining = self.energy * 60 / -battery
+        else:
+            remaining = None
+        update("remainInputTime", 59940 if battery <= 0 else round(remaining))
+        update("remainOutTime", 59940 if battery >= 0 else round(remaining))
+        for pack in self.packs:
+            pack["socLevel"] = round(soc)
+            pack["power"] = abs(battery) // len(self.packs)
+            pack["state"] = props["packState"]
+        return changed
+
+    def message(self, method, **options):
+        options["method"] = method
+        options["deviceId"] = str(config.DEVICE_ID)
+        options["timestamp"] = int(time.time())
+        return json.dumps(options).encode()
+
+    def handle(self, msg):
+        """Process a message written by the client"""
+        method = msg.get("method")
+        if method == "getInfo":
+            yield self.message(
+                "getInfo-rsp",
+                deviceSn=self.sn,
+                modules=[{"type": 1, "softVersion": 4113}],
+                firmwares=[{"type": "MASTER", "version": 4113}],
+            )
+        elif method == "read" and "getAll" in msg.get("properties", []):
+            yield self.message(
+                "read-rsp", properties=self.properties, packData=self.packs
+            )
+        elif method == "write":
+            changed = {}
+            for key, value in msg.get("properties", {}).items():
+                if key in self.properties:
+                    self.properties[key] = value
+                    changed[key] = value
+            yield self.message("write-rsp", success=True)
+            if changed:
+                yield self.message("report", properties=changed)
+
+    async def run(self):
+        last = time.time()
+        while True:
+            await asyncio.sleep(self.report_interval)
+            now = time.time()
+            changed = self.step(now - last)
+            last = now
+            connection = self.connection
+            if connection is None or not connection.ready:
+                continue
+            if changed:
+                connection.notify(self.message("report", properties=changed))
+            if random.random() < 0.2:
+                connection.notify(self.message("report", packData=self.packs))
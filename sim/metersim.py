@@ -0,0 +1,88 @@
+import asyncio
+import json
+import random
+import time
+
+
+class Meter:
+    """Simulated electricity meter serving JSON over HTTP like Unrud/Meter"""
+
+    def __init__(self, hub, port=8081):
+        self.hub = hub
+        self.port = port
+        self.base_load = 250
+        self.extra_load = 0
+        self.extra_load_until = 0
+        self.power_min = self.power_avg = self.power_max = 0
+        self._samples = []
+        self.import_energy = 0  # Wh
+        self.export_energy = 0  # Wh
+
+    def load(self, now):
+        # Occasional appliances like a kettle or a washing machine
+        if now >= self.extra_load_until:
+            self.extra_load = 0
+            if random.random() < 0.02:
+                self.extra_load = random.choice([150, 800, 2000])
+                self.extra_load_until = now + random.randint(60, 600)
+        return self.base_load + random.randint(-20, 20) + self.extra_load
+
+    def data(self):
+        return {
+            "activePower": round(self.power_avg),
+            "activePowerMin": round(self.power_min),
+            "activePowerAvg": round(self.power_avg),
+            "activePowerMax": round(self.power_max),
+            "importEnergy": round(self.import_energy, 3),
+            "exportEnergy": round(self.export_energy, 3),
+        }
+
+    def sample(self, now):
+        # Aggregate one-second samples over a sliding minute
+        samples = self._samples
+        power = self.load(now) - self.hub.output_power
+        if power > 0:
+            self.import_energy += power / 3600
+        else:
+            self.export_energy -= power / 3600
+        samples.append(power)
+        del samples[:-60]
+        self.power_min = min(samples)
+        self.power_max = max(samples)
+        self.power_avg = sum(samples) / len(samples)
+
+    async def _measure(self):
+        while True:
+            self.sample(time.time())
+            await asyncio.sleep(1)
+
+    async def _handle(self, reader, writer):
+        try:
+            keep_alive = True
+            while keep_alive:
+                line = await reader.readline()
+                if not line:
+                    break
+                keep_alive = line.rstrip().endswith(b"HTTP/1.1")
+                while True:
+                    line = await reader.readline()
+                    if not line or line == b"\r\n":
+                        break
+                    if line.lower().startswith(b"connection:"):
+                        keep_alive = b"keep-alive" in line.lower()
+                body = json.dumps(self.data()).encode()
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\n"
+                    + b"Content-Type: application/json\r\n"
+                    + f"Content-Length: {len(body)}\r\n".encode()
+                    + (b"\r\n" if keep_alive else b"Connection: close\r\n\r\n")
+                )
+                writer.write(body)
+                await writer.drain()
+        finally:
+            writer.close()
+            await writer.wait_closed()
+
+    async def serve(self):
+        asyncio.create_task(self._measure())
+        await asyncio.start_server(self._handle, "127.0.0.1", self.port)
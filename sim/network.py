@@ -0,0 +1,32 @@
+STA_IF = 0
+
+
+def country(code=None):
+    pass
+
+
+def hostname(name=None):
+    pass
+
+
+class WLAN:
+    def __init__(self, interface_id=STA_IF):
+        self._active = False
+        self._connected = False
+
+    def active(self, is_active=None):
+        if is_active is None:
+            return self._active
+        self._active = is_active
+
+    def connect(self, ssid=None, key=None):
+        self._connected = True
+
+    def disconnect(self):
+        self._connected = False
+
+    def deinit(self):
+        pass
+
+    def isconnected(self):
+        return self._active and self._connected
@@ -0,0 +1,3 @@
+def settime():
+    # The host clock is already synchronized
+    pass
@@ -0,0 +1,37 @@
+MTU_PAYLOAD = 1460  # TCP payload of an Ethernet frame
+
+_pool = []
+_pool_size = 2
+
+
+def coalesce(chunks, size=MTU_PAYLOAD):
+    """Join small chunks of a generator into writes of up to `size` bytes
+
+    The buffer is reused across calls, a yielded memoryview is only valid
+    until the next chunk is requested.
+    """
+    buffer = _pool.pop() if _pool and len(_pool[-1]) == size else bytearray(size)
+    view = memoryview(buffer)
+    used = 0
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            length = len(chunk)
+            if used + length <= size:
+                buffer[used : used + length] = chunk
+                used += length
+                continue
+            if used:
+                yield view[:used]
+                used = 0
+            if length >= size:
+                yield chunk
+            else:
+                buffer[:length] = chunk
+                used = length
+        if used:
+            yield view[:used]
+    finally:
+        if len(_pool) < _pool_size:
+            _pool.append(buffer)
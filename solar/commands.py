@@ -0,0 +1,121 @@
+import asyncio
+import sys
+import time
+
+_MISSING = object()
+
+
+class CommandQueue:
+    """Bounded queue of commands that are sent by a single writer task
+
+    Pending `write` commands are merged into one message, a newer value
+    replaces an older value of the same property that was not sent yet.
+    Written properties are acknowledged when the hub reports the same
+    value within `ack_timeout` milliseconds, or right away when they
+    already had that value, since the hub may not report them again.
+    """
+
+    def __init__(self, size=8, ack_timeout=30_000):
+        self.size = size
+        self.ack_timeout = ack_timeout
+        self._queue = []  # (method, options)
+        self._event = asyncio.Event()
+        self._unacked = {}  # property -> (value, ticks when sent)
+        self.sent = 0
+        self.superseded = 0
+        self.dropped = 0
+        self.acked = 0
+        self.unchanged = 0
+        self.timeouts = 0
+        self.latency_last = None
+        self.latency_max = 0
+        self._latency_total = 0
+
+    def send(self, method, **options):
+        for command in self._queue:
+            if command[0] == method and command[1] == options:
+                return
+        if len(self._queue) >= self.size:
+            self.dropped += 1
+            raise ValueError("command queue full")
+        self._queue.append((method, options))
+        self._event.set()
+
+    def write(self, properties):
+        for method, options in self._queue:
+            if method == "write":
+                pending = options["properties"]
+                self.superseded += sum(1 for key in properties if key in pending)
+                pending.update(properties)
+                return
+        self.send("write", properties=dict(properties))
+
+    def clear(self):
+        self._queue.clear()
+        self._unacked.clear()
+
+    def acknowledge(self, properties):
+        """Check reported properties against unacknowledged writes"""
+        now = time.ticks_ms()
+        for key in list(self._unacked):
+            value, ticks = self._unacked[key]
+            latency = time.ticks_diff(now, ticks)
+            if properties.get(key, _MISSING) == value:
+                del self._unacked[key]
+                self.acked += 1
+                self.latency_last = latency
+                self.latency_max = max(self.latency_max, latency)
+                self._latency_total += latency
+            elif latency > self.ack_timeout:
+                del self._unacked[key]
+                self.timeouts += 1
+
+    def unconfirmed(self):
+        """Whether writes are queued or waiting for acknowledgement"""
+        self.acknowledge({})
+        return bool(self._unacked) or any(
+            method == "write" for method, _ in self._queue
+        )
+
+    def stats(self):
+        return {
+            "queued": len(self._queue),
+            "unacked": len(self._unacked),
+            "sent": self.sent,
+            "superseded": self.superseded,
+            "dropped": self.dropped,
+            "acked": self.acked,
+            "unchanged": self.unchanged,
+            "timeouts": self.timeouts,
+            "latencyLast": self.latency_last,
+            "latencyMax": self.latency_max,
+            "latencyAvg": self._latency_total // self.acked if self.acked else None,
+        }
+
+    async def run(self, send, current=None):
+        """Send queued commands with the coroutine function `send`
+
+        `current` returns the last reported value of a property.
+        """
+        while True:
+            if not self._queue:
+                self._event.clear()
+                await self._event.wait()
+                continue
+            method, options = self._queue.pop(0)
+            try:
+                await send(method, **options)
+            except MemoryError:
+                raise
+            except Exception as e:
+                sys.print_exception(e)
+                continue
+            self.sent += 1
+            if method == "write":
+                now = time.ticks_ms()
+                for key, value in options["properties"].items():
+                    if current is not None and current(key, _MISSING) == value:
+                        self._unacked.pop(key, None)
+                        self.unchanged += 1
+                    else:
+                        self._unacked[key] = (value, now)
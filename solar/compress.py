@@ -0,0 +1,77 @@
+import deflate
+import io
+
+GZIP = deflate.GZIP
+ZLIB = deflate.ZLIB
+
+
+class _Sink(io.IOBase):
+    def __init__(self):
+        self.data = bytearray()
+
+    def write(self, data):
+        self.data.extend(data)
+        return len(data)
+
+
+def accepted_format(accept_encoding):
+    """Deflate format for an Accept-Encoding header or None"""
+    codings = []
+    for coding in accept_encoding.split(","):
+        coding, *params = coding.split(";")
+        for param in params:
+            key, *value = param.strip().split("=", 1)
+            if key == "q" and value and value[0].strip() in ("0", "0.0", "0.00"):
+                break
+        else:
+            codings.append(coding.strip().lower())
+    if "gzip" in codings:
+        return GZIP
+    if "deflate" in codings:
+        return ZLIB
+    return None
+
+
+def buffered(chunks, size):
+    """Read a generator until `size` bytes are available
+
+    Returns the data as `bytes` when the generator ended before, otherwise
+    a generator of all chunks.
+    """
+    head = []
+    length = 0
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode()
+        head.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            return _chain(head, chunks)
+    return b"".join(head)
+
+
+def _chain(head, chunks):
+    yield from head
+    yield from chunks
+
+
+def compress(chunks, format=GZIP, wbits=10, size=512):
+    """Compress chunks of a generator with a window of 2**`wbits` bytes
+
+    Compressed data is yielded once at least `size` bytes are available.
+    """
+    sink = _Sink()
+    with deflate.DeflateIO(sink, format, wbits) as f:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            f.write(chunk)
+            if len(sink.data) >= size:
+                data, sink.data = sink.data, bytearray()
+                yield data
+    if sink.data:
+        yield sink.data
+
+
+def compress_bytes(data, format=GZIP, wbits=10):
+    return b"".join(compress((data,), format, wbits))
@@ -0,0 +1,25 @@
+import math
+
+
+def power_limit(incoming, output_power, output_limit, inverter_max_power, lower, upper):
+    """Output limit that keeps the power import between `lower` and `upper`
+
+    Returns the total power consumption, the import that remains at the
+    current limit, the new limit and whether changing the limit is skipped.
+    """
+    total = incoming + output_power
+    remaining = total - output_limit
+    target = round(total - (lower + upper) / 2)
+    new_limit = max(0, min(math.floor(inverter_max_power), round(target)))
+    if new_limit < 100:
+        new_limit = (new_limit // 30) * 30
+    skip = (
+        (lower <= remaining and remaining <= upper)
+        or output_limit == new_limit
+        or (
+            # The inverter doesn't reach the current limit
+            new_limit > output_limit
+            and output_power * 1.2 + 20 <= output_limit
+        )
+    )
+    return total, remaining, new_limit, skip
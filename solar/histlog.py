@@ -0,0 +1,151 @@
+import asyncio
+import os
+import struct
+import sys
+
+# Unix time followed by up to 6 channels, 16 bytes per record
+RECORD_FORMAT = "<l6h"
+RECORD_SIZE = struct.calcsize(RECORD_FORMAT)
+RECORD_CHANNELS = 6
+
+_MISSING = -0x8000
+
+
+class HistoryLog:
+    """Segmented append-only log of history samples on flash
+
+    Records are collected in RAM and written at most every `interval`
+    seconds in chunks of `chunk_size` bytes, yielding to the event loop
+    between chunks. Segments have a fixed size and the oldest segment is
+    removed when there are more than `segments`.
+    """
+
+    def __init__(
+        self,
+        path="history",
+        channels=5,
+        segment_size=16 * 1024,
+        segments=8,
+        buffer_records=64,
+        interval=15 * 60,
+        chunk_size=128,
+    ):
+        self.path = path
+        self.channels = channels
+        self.segment_records = segment_size // RECORD_SIZE
+        self.segments = segments
+        self.interval = interval
+        self.chunk_size = chunk_size
+        self._buffer = bytearray(buffer_records * RECORD_SIZE)
+        self._count = 0
+        self.dropped = 0
+        self.written = 0
+        self.flushes = 0
+        try:
+            os.mkdir(path)
+        except OSError:
+            pass
+        self._seqs = sorted(
+            int(name[:-4]) for name in os.listdir(path) if name.endswith(".bin")
+        )
+
+    def _segment(self, seq):
+        return f"{self.path}/{seq:08d}.bin"
+
+    def _segment_available(self, seq):
+        try:
+            size = os.stat(self._segment(seq))[6]
+        except OSError:
+            return self.segment_records
+        if size % RECORD_SIZE:
+            return 0  # Torn write, continue in a new segment
+        return self.segment_records - size // RECORD_SIZE
+
+    def append(self, time, sample):
+        buffer = self._buffer
+        offset = self._count * RECORD_SIZE
+        if offset >= len(buffer):
+            self.dropped += 1
+            return
+        struct.pack_into("<l", buffer, offset, time)
+        for channel in range(RECORD_CHANNELS):
+            value = sample[channel] if channel < self.channels else _MISSING
+            struct.pack_into("<h", buffer, offset + 4 + 2 * channel, value)
+        self._count += 1
+
+    async def _write(self, count):
+        if not self._seqs:
+            self._seqs.append(0)
+        written = 0
+        while written < count:
+            seq = self._seqs[-1]
+            available = self._segment_available(seq)
+            if available <= 0:
+                self._seqs.append(seq + 1)
+                while len(self._seqs) > self.segments:
+                    os.remove(self._segment(self._seqs.pop(0)))
+                continue
+            n = min(available, count - written)
+            buffer = memoryview(self._buffer)
+            with open(self._segment(seq), "ab") as f:
+                end = (written + n) * RECORD_SIZE
+                for offset in range(written * RECORD_SIZE, end, self.chunk_size):
+                    f.write(buffer[offset : min(offset + self.chunk_size, end)])
+                    await asyncio.sleep(0)
+            written += n
+        # Keep records that were appended while writing
+        rest = (self._count - count) * RECORD_SIZE
+        start = count * RECORD_SIZE
+        self._buffer[:rest] = memoryview(self._buffer)[start : start + rest]
+        self._count -= count
+        self.written += count
+        self.flushes += 1
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            if not self._count:
+                continue
+            try:
+                await self._write(self._count)
+            except MemoryError:
+                raise
+            except Exception as e:
+                sys.print_exception(e)
+
+    def oldest(self):
+        for seq in self._seqs:
+            for timestamp, _ in self.records(seqs=(seq,)):
+                return timestamp
+        return None
+
+    def records(self, start=None, end=None, seqs=None):
+        """Yield (time, values) of stored records in chronological order
+
+        `values` is a reused list of channel values with None for missing.
+        """
+        buffer = bytearray(16 * RECORD_SIZE)
+        values = [None] * self.channels
+        for seq in list(self._seqs if seqs is None else seqs):
+            try:
+                f = open(self._segment(seq), "rb")
+            except OSError:
+                continue
+            with f:
+                while True:
+                    n = f.readinto(buffer) // RECORD_SIZE
+                    if not n:
+                        break
+                    for i in range(n):
+                        record = struct.unpack_from(
+                            RECORD_FORMAT, buffer, i * RECORD_SIZE
+                        )
+                        timestamp = record[0]
+                        if start is not None and timestamp < start:
+                            continue
+                        if end is not None and timestamp > end:
+                            return
+                        for channel in range(self.channels):
+                            value = record[1 + channel]
+                            values[channel] = None if value == _MISSING else value
+                        yield timestamp, values
@@ -0,0 +1,160 @@
+from array import array
+
+CHANNELS = ("solar", "output", "battery", "grid", "limit")
+
+_MISSING = -0x8000
+
+
+class Series:
+    """Ring buffer of samples at a fixed resolution"""
+
+    def __init__(self, resolution, capacity, channels=len(CHANNELS)):
+        self.resolution = resolution  # seconds, 0 for raw samples
+        self.capacity = capacity
+        self.channels = channels
+        self.times = array("l", [0] * capacity)
+        self.values = array("h", [_MISSING] * (capacity * channels))
+        self._start = 0
+        self._len = 0
+        # Accumulator for the bucket that is currently being rolled up
+        self._bucket = None
+        self._sums = array("l", [0] * channels)
+        self._counts = array("H", [0] * channels)
+
+    def __len__(self):
+        return self._len
+
+    def _append(self, time, sample):
+        capacity, channels = self.capacity, self.channels
+        if self._len < capacity:
+            i = (self._start + self._len) % capacity
+            self._len += 1
+        else:
+            i = self._start
+            self._start = (self._start + 1) % capacity
+        self.times[i] = time
+        values = self.values
+        offset = i * channels
+        for channel in range(channels):
+            values[offset + channel] = sample[channel]
+
+    def _flush(self, sample):
+        """Store the average of the current bucket in `sample`"""
+        sums, counts = self._sums, self._counts
+        for channel in range(self.channels):
+            count = counts[channel]
+            sample[channel] = sums[channel] // count if count else _MISSING
+            sums[channel] = 0
+            counts[channel] = 0
+        time = self._bucket * self.resolution
+        self._append(time, sample)
+        return time
+
+    def add(self, time, sample, rollup):
+        """Add a sample and return the time of a completed bucket or None
+
+        The average of a completed bucket is written to `rollup`.
+        """
+        if not self.resolution:
+            self._append(time, sample)
+            return None
+        bucket = time // self.resolution
+        completed = None
+        if self._bucket is not None and bucket != self._bucket:
+            completed = self._flush(rollup)
+        self._bucket = bucket
+        sums, counts = self._sums, self._counts
+        for channel in range(self.channels):
+            value = sample[channel]
+            if value != _MISSING:
+                sums[channel] += value
+                counts[channel] += 1
+        return completed
+
+    def oldest(self):
+        return self.times[self._start] if self._len else None
+
+    def rows(self, start=None, end=None):
+        """Yield (time, values) of stored samples in chronological order
+
+        `values` is a reused list of channel values with None for missing.
+        """
+        capacity, channels = self.capacity, self.channels
+        values = [None] * channels
+        for n in range(self._len):
+            i = (self._start + n) % capacity
+            time = self.times[i]
+            if start is not None and time < start:
+                continue
+            if end is not None and time > end:
+                break
+            for channel in range(channels):
+                value = self.values[i * channels + channel]
+                values[channel] = None if value == _MISSING else value
+            yield time, values
+
+
+class History:
+    """Samples with fixed memory usage and rollups raw -> 1 min -> 15 min
+
+    1 minute rollups are also appended to `log` if given.
+    """
+
+    def __init__(self, raw=180, minutes=240, quarters=192, log=None):
+        self.log = log
+        self.levels = (Series(0, raw), Series(60, minutes), Series(15 * 60, quarters))
+        self._sample = array("h", [_MISSING] * len(CHANNELS))
+        self._rollup = array("h", [_MISSING] * len(CHANNELS))
+        self._rollup2 = array("h", [_MISSING] * len(CHANNELS))
+
+    def add(self, time, solar, output, battery, grid, limit):
+        sample = self._sample
+        sample[0] = _clamp(solar)
+        sample[1] = _clamp(output)
+        sample[2] = _clamp(battery)
+        sample[3] = _clamp(grid)
+        sample[4] = _clamp(limit)
+        raw, minutes, quarters = self.levels
+        raw.add(time, sample, None)
+        completed = minutes.add(time, sample, self._rollup)
+        if completed is not None:
+            quarters.add(completed, self._rollup, self._rollup2)
+            if self.log:
+                self.log.append(completed, self._rollup)
+
+    def _oldest(self, series):
+        oldest = series.oldest()
+        if self.log and series is self.levels[1]:
+            logged = self.log.oldest()
+            if logged is not None and (oldest is None or logged < oldest):
+                return logged
+        return oldest
+
+    def select(self, resolution=None, start=None):
+        """Return the series for `resolution` or the finest covering `start`"""
+        if resolution is not None:
+            for series in self.levels:
+                if series.resolution == resolution:
+                    return series
+            raise ValueError(f"invalid resolution: {resolution!r}")
+        for series in self.levels:
+            oldest = self._oldest(series)
+            if start is None or (oldest is not None and oldest <= start):
+                return series
+        return self.levels[-1]
+
+    def rows(self, series, start=None, end=None):
+        """Yield (time, values) of `series` including logged samples"""
+        oldest = series.oldest()
+        if self.log and series is self.levels[1]:
+            log_end = end if oldest is None else oldest - 1
+            if end is not None:
+                log_end = min(log_end, end)
+            yield from self.log.records(start, log_end)
+        yield from series.rows(start, end)
+
+
+def _clamp(value):
+    if value is None:
+        return _MISSING
+    return max(-0x7FFF, min(0x7FFF, int(value)))
@@ -0,0 +1,142 @@
+import asyncio
+import socket
+import time
+
+
+class HTTPClient:
+    """HTTP/1.1 client for GET requests to one URL over a kept-alive connection
+
+    The resolved address of the host is cached for `dns_ttl` milliseconds.
+    Response bodies of any length are received in chunks of up to
+    `buffer_size` bytes, a chunk is only valid until the next one.
+    """
+
+    def __init__(self, url, buffer_size=256, dns_ttl=10 * 60_000, timeout=10_000):
+        scheme, _, rest = url.partition("://")
+        host, _, path = rest.partition("/")
+        if scheme != "http" or not host:
+            raise ValueError(f"unsupported URL: {url!r}")
+        self.host, *port = host.split(":", 1)
+        self.port = int(port[0]) if port else 80
+        self._request = (
+            f"GET /{path} HTTP/1.1\r\nHost: {host}\r\n"
+            + "Connection: keep-alive\r\n\r\n"
+        ).encode()
+        self.dns_ttl = dns_ttl
+        self.timeout = timeout
+        self._buffer = bytearray(buffer_size)
+        self._address = None
+        self._address_ticks = None
+        self._reader = self._writer = None
+        self._receiving = False
+        self.requests = 0
+        self.connects = 0
+        self.resolves = 0
+        self.latency_last = None
+        self.latency_max = 0
+
+    def _resolve(self):
+        if self._address is not None and (
+            time.ticks_diff(time.ticks_ms(), self._address_ticks) < self.dns_ttl
+        ):
+            return self._address
+        # Blocks the event loop, hence the cache
+        family, _, _, _, address = socket.getaddrinfo(
+            self.host, self.port, 0, socket.SOCK_STREAM
+        )[0]
+        if not isinstance(address, tuple):
+            # Unix port: struct sockaddr_in with the IPv4 address at offset 4
+            address = (socket.inet_ntop(family, address[4:8]), self.port)
+        self._address = address[0]
+        self._address_ticks = time.ticks_ms()
+        self.resolves += 1
+        return self._address
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+    async def get(self, consume):
+        """Pass the body of a GET request to `consume` and return the status code
+
+        `consume` is called with each received chunk of the body.
+        """
+        start = time.ticks_ms()
+        for retry in (False, True):
+            reused = self._writer is not None
+            try:
+                if not reused:
+                    self._reader, self._writer = await asyncio.wait_for_ms(
+                        asyncio.open_connection(self._resolve(), self.port),
+                        self.timeout,
+                    )
+                    self.connects += 1
+                status = await asyncio.wait_for_ms(self._get(consume), self.timeout)
+                break
+            except MemoryError:
+                raise
+            except Exception:
+                self.close()
+                self._address = None
+                # The server may have closed a kept-alive connection, unless
+                # the response was received already
+                if not reused or retry or self._receiving:
+                    raise
+        self.requests += 1
+        self.latency_last = time.ticks_diff(time.ticks_ms(), start)
+        self.latency_max = max(self.latency_max, self.latency_last)
+        return status
+
+    async def _get(self, consume):
+        reader, writer = self._reader, self._writer
+        self._receiving = False
+        writer.write(self._request)
+        await writer.drain()
+        line = await reader.readline()
+        if not line:
+            raise OSError("connection closed")
+        self._receiving = True
+        version, status, *_ = line.split(None, 2)
+        keep_alive = version == b"HTTP/1.1"
+        length = None
+        while True:
+            line = await reader.readline()
+            if not line:
+                raise OSError("connection closed")
+            if line == b"\r\n":
+                break
+            name, *value = line.split(b":", 1)
+            name = name.strip().lower()
+            value = value[0].strip().lower() if value else b""
+            if name == b"content-length":
+                length = int(value)
+            elif name == b"connection":
+                keep_alive = value == b"keep-alive"
+            elif name == b"transfer-encoding" and value != b"identity":
+                raise ValueError(f"unsupported transfer encoding: {value!r}")
+        buffer = memoryview(self._buffer)
+        remaining = length
+        while remaining is None or remaining > 0:
+            if remaining is not None and remaining < len(buffer):
+                buffer = buffer[:remaining]
+            n = await reader.readinto(buffer)
+            if not n:
+                if remaining is not None:
+                    raise OSError("connection closed")
+                break
+            consume(buffer[:n])
+            if remaining is not None:
+                remaining -= n
+        if length is None or not keep_alive:
+            self.close()
+        return int(status)
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "connects": self.connects,
+            "resolves": self.resolves,
+            "latencyLast": self.latency_last,
+            "latencyMax": self.latency_max,
+        }
@@ -0,0 +1,118 @@
+import json
+
+_WHITESPACE = (0x20, 0x09, 0x0A, 0x0D)
+_OBJECT_START = 0x7B  # {
+_OBJECT_END = 0x7D  # }
+_COLON = 0x3A  # :
+_NOT_SCALAR = (0x22, 0x5B, 0x7B)  # " [ {
+
+
+def _skip_whitespace(data, i, end):
+    while i < end and data[i] in _WHITESPACE:
+        i += 1
+    return i
+
+
+class FieldScanner:
+    """Extracts number fields from a flat JSON object while it is received
+
+    The document is passed to `feed` in chunks of any size. The keys are
+    searched with `bytes.find` and only the values of `names` are decoded,
+    missing fields are None. Bytes at the end of a chunk that may belong to
+    a key or value are kept for the next chunk. `finish` raises TypeError
+    when the document isn't an object or a field isn't a number, otherwise
+    it returns a new dict with the values.
+    """
+
+    def __init__(self, names, value_size=32):
+        self._names = tuple(
+            name for i, name in enumerate(names) if name not in names[:i]
+        )
+        self._keys = tuple(f'"{name}"'.encode() for name in self._names)
+        self._overlap = max(len(key) for key in self._keys) - 1
+        self._value_size = value_size
+        self._values = [None] * len(self._names)
+        self._found = [False] * len(self._names)
+        self.reset()
+
+    def reset(self):
+        """Start a new document"""
+        for i in range(len(self._names)):
+            self._values[i] = None
+            self._found[i] = False
+        self._tail = b""
+        self._first = None  # First and last byte other than whitespace
+        self._last = None
+        self._error = None
+
+    def scan(self, data):
+        self.reset()
+        self.feed(data)
+        return self.finish()
+
+    def feed(self, data):
+        """Process the next chunk, errors are raised by `finish`"""
+        if self._error is not None or not data:
+            return
+        if not isinstance(data, bytes):
+            data = bytes(data)
+        try:
+            self._feed(self._tail + data if self._tail else data)
+        except TypeError as e:
+            self._error = e
+            self._tail = b""
+
+    def finish(self):
+        if self._error is not None:
+            raise self._error
+        if self._first != _OBJECT_START:
+            raise TypeError("invalid meter data: not an object")
+        if self._last != _OBJECT_END:
+            raise TypeError("invalid meter data: incomplete object")
+        return dict(zip(self._names, self._values))
+
+    def _feed(self, data):
+        end = len(data)
+        i = end
+        while i > 0 and data[i - 1] in _WHITESPACE:
+            i -= 1
+        if i > 0:
+            self._last = data[i - 1]
+            if self._first is None:
+                self._first = data[_skip_whitespace(data, 0, end)]
+                if self._first != _OBJECT_START:
+                    raise TypeError("invalid meter data: not an object")
+        # Keep a possibly split key, or the key of an unfinished value
+        keep = max(0, end - self._overlap)
+        for field, key in enumerate(self._keys):
+            if self._found[field]:
+                continue
+            i = data.find(key)
+            while i >= 0:
+                j = _skip_whitespace(data, i + len(key), end)
+                if j < end and data[j] != _COLON:
+                    i = data.find(key, i + 1)
+                    continue
+                j = _skip_whitespace(data, j + 1, end)
+                k = data.find(b",", j)
+                m = data.find(b"}", j)
+                if k < 0 or 0 <= m < k:
+                    k = m
+                if (end if k < 0 else k) - j > self._value_size:
+                    raise TypeError("invalid meter data: value too long")
+                if j >= end or k < 0:
+                    keep = min(keep, i)
+                    break
+                if data[j] in _NOT_SCALAR:
+                    raise TypeError(
+                        f"invalid meter data: {self._names[field]} is not a number"
+                    )
+                try:
+                    self._values[field] = json.loads(data[j:k])
+                except ValueError:
+                    raise TypeError(
+                        f"invalid meter data: {self._names[field]} is not a number"
+                    )
+                self._found[field] = True
+                break
+        self._tail = data[keep:]
@@ -0,0 +1,27 @@
+import json
+
+
+def encode(value):
+    """Yield the JSON encoding of `value` in small chunks
+
+    The output is the same as `json.dumps(value)`. Objects with an `items`
+    method are encoded as objects and other iterables as arrays, so the
+    stores and ring buffers don't need to be copied. Mappings are
+    snapshotted before encoding, because they may change while the
+    chunks are sent.
+    """
+    if value is None or isinstance(value, (str, int, float, bool)):
+        yield json.dumps(value)
+    elif hasattr(value, "items"):
+        yield "{"
+        for i, (key, item) in enumerate(list(value.items())):
+            yield f", {json.dumps(key)}: " if i else f"{json.dumps(key)}: "
+            yield from encode(item)
+        yield "}"
+    else:
+        yield "["
+        for i, item in enumerate(value):
+            if i:
+                yield ", "
+            yield from encode(item)
+        yield "]"
@@ -0,0 +1,54 @@
+import json
+
+
+class Reassembler:
+    """Decodes JSON messages that may be split across BLE notifications
+
+    A notification holding a complete message is decoded without copying.
+    Parts of a split message are collected in a fixed buffer of
+    `capacity` bytes and decoded once the message is complete.
+    """
+
+    def __init__(self, capacity=4096):
+        self._buffer = bytearray(capacity)
+        self._len = 0
+        self.fragmented = 0
+        self.dropped = 0
+
+    def clear(self):
+        self._len = 0
+
+    def feed(self, data):
+        """Return the decoded message or None while it is incomplete"""
+        if not self._len:
+            try:
+                return json.loads(data)
+            except ValueError:
+                pass
+        start, end = self._len, self._len + len(data)
+        if end > len(self._buffer):
+            self.dropped += 1
+            self._len = 0
+            return None
+        self._buffer[start:end] = data
+        self._len = end
+        # Only the last part of a message can end with a closing brace
+        if not data.rstrip().endswith(b"}"):
+            return None
+        try:
+            msg = json.loads(memoryview(self._buffer)[:end])
+        except ValueError:
+            if not start:
+                return None
+            try:
+                # A new message after a part of a message that got lost
+                msg = json.loads(data)
+            except ValueError:
+                return None
+            if not isinstance(msg, dict) or "method" not in msg:
+                return None  # Part of a nested object
+            self.dropped += 1
+        else:
+            self.fragmented += 1
+        self._len = 0
+        return msg
@@ -0,0 +1,43 @@
+class RingBuffer:
+    """List-like container that keeps the newest `capacity` items"""
+
+    def __init__(self, capacity):
+        self._items = [None] * capacity
+        self._start = 0
+        self._len = 0
+        self.evicted = 0
+
+    @property
+    def capacity(self):
+        return len(self._items)
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        items = self._items
+        capacity = len(items)
+        for i in range(self._start, self._start + self._len):
+            yield items[i % capacity]
+
+    def append(self, item):
+        items = self._items
+        capacity = len(items)
+        if self._len < capacity:
+            items[(self._start + self._len) % capacity] = item
+            self._len += 1
+        else:
+            items[self._start] = item
+            self._start = (self._start + 1) % capacity
+            self.evicted += 1
+
+    def extend(self, iterable):
+        for item in iterable:
+            self.append(item)
+
+    def clear(self):
+        items = self._items
+        for i in range(len(items)):
+            items[i] = None
+        self._start = 0
+        self._len = 0
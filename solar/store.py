@@ -0,0 +1,181 @@
+from array import array
+
+# Properties reported by the hub that are stored in integer slots,
+# all other properties and non-integer values are kept in a dict
+HUB_PROPERTIES = (
+    "autoRecover",
+    "buzzerSwitch",
+    "electricLevel",
+    "hubState",
+    "inverseMaxPower",
+    "masterSoftVersion",
+    "minSoc",
+    "outputHomePower",
+    "outputLimit",
+    "outputPackPower",
+    "packInputPower",
+    "packNum",
+    "packState",
+    "pass",
+    "passMode",
+    "pvBrand",
+    "remainInputTime",
+    "remainOutTime",
+    "socSet",
+    "solarInputPower",
+    "solarPower1",
+    "solarPower2",
+)
+PACK_PROPERTIES = (
+    "maxTemp",
+    "maxVol",
+    "minVol",
+    "power",
+    "socLevel",
+    "softVersion",
+    "soh",
+    "state",
+    "totalVol",
+)
+
+_UNSET = -0x80000000
+_MISSING = object()
+
+
+def schema(names):
+    return {name: slot for slot, name in enumerate(names)}
+
+
+class PropertyStore:
+    """Dict-like property container backed by an integer array
+
+    `update` records the revision in which each property last changed and
+    returns whether any property changed.
+    """
+
+    __slots__ = (
+        "_schema",
+        "_values",
+        "_extra",
+        "_revisions",
+        "_extra_revisions",
+        "revision",
+    )
+
+    def __init__(self, schema):
+        self._schema = schema
+        self._values = array("l", [_UNSET] * len(schema))
+        self._extra = {}
+        self._revisions = array("l", [0] * len(schema))
+        self._extra_revisions = {}
+        self.revision = 0  # Revision of the last change
+
+    def get(self, key, default=None):
+        slot = self._schema.get(key)
+        if slot is not None:
+            value = self._values[slot]
+            if value != _UNSET:
+                return value
+        return self._extra.get(key, default)
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        slot = self._schema.get(key)
+        if slot is not None:
+            if type(value) is int and _UNSET < value <= 0x7FFFFFFF:
+                self._values[slot] = value
+                if self._extra:
+                    self._extra.pop(key, None)
+                return
+            self._values[slot] = _UNSET
+        self._extra[key] = value
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self):
+        return sum(1 for value in self._values if value != _UNSET) + len(self._extra)
+
+    def items(self):
+        values = self._values
+        for key, slot in self._schema.items():
+            if values[slot] != _UNSET:
+                yield key, values[slot]
+        yield from self._extra.items()
+
+    def update(self, properties, revision=0):
+        changed = False
+        for key, value in properties.items():
+            if self.get(key, _MISSING) == value:
+                continue
+            self[key] = value
+            slot = self._schema.get(key)
+            if slot is not None:
+                self._revisions[slot] = revision
+            # Values of schema properties that aren't integers are extras too
+            if slot is None or key in self._extra:
+                self._extra_revisions[key] = revision
+            self.revision = revision
+            changed = True
+        return changed
+
+    def changed(self, since):
+        """Yield (key, value) of properties changed after revision `since`"""
+        values, revisions = self._values, self._revisions
+        for key, slot in self._schema.items():
+            if revisions[slot] > since and values[slot] != _UNSET:
+                yield key, values[slot]
+        for key, value in self._extra.items():
+            if self._extra_revisions.get(key, 0) > since:
+                yield key, value
+
+    def clear(self):
+        values, revisions = self._values, self._revisions
+        for slot in range(len(values)):
+            values[slot] = _UNSET
+            revisions[slot] = 0
+        self._extra.clear()
+        self._extra_revisions.clear()
+        self.revision = 0
+
+
+class PackList:
+    """List of battery pack properties, merged by serial number"""
+
+    def __init__(self, schema):
+        self._schema = schema
+        self._packs = []
+        self._index = {}  # sn -> position in _packs
+
+    def __len__(self):
+        return len(self._packs)
+
+    def __iter__(self):
+        return iter(self._packs)
+
+    def update(self, packs, revision=0):
+        changed = False
+        for pack in packs:
+            sn = pack["sn"]
+            i = self._index.get(sn)
+            if i is None:
+                i = self._index[sn] = len(self._packs)
+                self._packs.append(PropertyStore(self._schema))
+            if self._packs[i].update(pack, revision):
+                changed = True
+        return changed
+
+    def changed(self, since):
+        """Yield (sn, changed properties) of packs changed after `since`"""
+        for pack in self._packs:
+            if pack.revision > since:
+                yield pack["sn"], pack.changed(since)
+
+    def clear(self):
+        self._packs.clear()
+        self._index.clear()
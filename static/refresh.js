@@ -0,0 +1,63 @@
+"use strict";
+(() => {
+  const refreshInterval = Number(document.currentScript.dataset.refreshInterval);
+  let startTime = Date.now();
+  let timeoutId = 0;
+
+  function showError() {
+    const element = document.getElementById("error");
+    if (element) element.style.removeProperty("display");
+  }
+
+  async function update() {
+    window.clearTimeout(timeoutId);
+    document.removeEventListener("visibilitychange", update);
+    if (document.hidden) {
+      console.debug("Update: document hidden");
+      document.addEventListener("visibilitychange", update);
+      return;
+    }
+    const elapsed = Date.now() - startTime;
+    if (elapsed >= 0 && elapsed < refreshInterval) {
+      const wait = refreshInterval - elapsed;
+      console.debug("Update: waiting", wait);
+      timeoutId = window.setTimeout(update, wait);
+      document.addEventListener("visibilitychange", update);
+      return;
+    }
+    if (elapsed < 0 || elapsed >= refreshInterval * 2) {
+      console.debug("Update: stale");
+      showError();
+    }
+    console.debug("Update: fetch");
+    try {
+      const resp = await fetch(location.href);
+      if (!resp.ok) {
+        throw new Error(`Response status: ${resp.status}`);
+      }
+      document.documentElement.innerHTML = await resp.text();
+      console.debug("Update: success");
+    } catch (err) {
+      console.error("Update: error", err);
+      showError();
+    }
+    startTime = Date.now();
+    update();
+  }
+
+  if (window.EventSource) {
+    const events = new EventSource("/events");
+    events.onmessage = (event) => {
+      for (const [id, html] of Object.entries(JSON.parse(event.data))) {
+        const element = document.getElementById(id);
+        if (element) element.innerHTML = html;
+      }
+    };
+    events.onerror = (err) => {
+      console.error("Events: error", err);
+      showError();
+    };
+  } else {
+    update();
+  }
+})();
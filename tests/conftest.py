@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Appended, because the locale package of the repository would shadow the
+# standard library module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
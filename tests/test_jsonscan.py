@@ -0,0 +1,86 @@
+import pytest
+
+from solar.jsonscan import FieldScanner
+
+NAMES = ("activePowerMin", "activePowerAvg")
+
+
+def scan_in_chunks(scanner, data, size):
+    scanner.reset()
+    for offset in range(0, len(data), size):
+        scanner.feed(memoryview(data)[offset : offset + size])
+    return scanner.finish()
+
+
+def test_fields():
+    data = (
+        b' {"activePower": -3, "s": "\\"activePowerMin\\": 7",'
+        + b' "t": "activePowerMin", "activePowerMin" : -12.5 ,'
+        + b'"activePowerAvg":40}\r\n'
+    )
+    for size in range(1, len(data) + 1):
+        result = scan_in_chunks(FieldScanner(NAMES), data, size)
+        assert result == {"activePowerMin": -12.5, "activePowerAvg": 40}
+
+
+def test_long_document():
+    data = (
+        b'{"activePowerMin": 1, '
+        + b", ".join(b'"field%d": %d' % (i, i) for i in range(200))
+        + b', "activePowerAvg": 2.5}'
+    )
+    for size in (1, 5, 16, 256):
+        result = scan_in_chunks(FieldScanner(NAMES), data, size)
+        assert result == {"activePowerMin": 1, "activePowerAvg": 2.5}
+
+
+def test_missing_and_null():
+    scanner = FieldScanner(NAMES)
+    assert scanner.scan(b'{"activePowerMin": null}') == {
+        "activePowerMin": None,
+        "activePowerAvg": None,
+    }
+    assert scanner.scan(b"{}") == {"activePowerMin": None, "activePowerAvg": None}
+
+
+def test_same_name_twice():
+    scanner = FieldScanner(("activePowerMin", "activePowerMin"))
+    assert scanner.scan(b'{"activePowerMin": 5}') == {"activePowerMin": 5}
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        b"",
+        b"   ",
+        b"[1]",
+        b'"activePowerMin": 5',
+        b'{"activePowerMin": 5',
+        b'{"activePowerMin": 5, "activePowerAvg": 6',
+        b'{"activePowerMin": "5"}',
+        b'{"activePowerMin": {"value": 5}}',
+        b'{"activePowerMin": [5]}',
+        b'{"activePowerMin": }',
+        b'{"activePowerMin": 5x}',
+        b'{"activePowerMin": 5]',
+        b'{"activePowerMin": 123456789012345678901234567890123456789}',
+    ],
+)
+def test_invalid(data):
+    scanner = FieldScanner(NAMES)
+    with pytest.raises(TypeError):
+        scanner.scan(data)
+    for size in (1, 4):
+        with pytest.raises(TypeError):
+            scan_in_chunks(scanner, data, size)
+
+
+def test_results_are_not_changed():
+    scanner = FieldScanner(NAMES)
+    result = scanner.scan(b'{"activePowerMin": 1, "activePowerAvg": 2}')
+    with pytest.raises(TypeError):
+        scanner.scan(b'{"activePowerMin": 5, "activePowerAvg": "x"}')
+    with pytest.raises(TypeError):
+        scanner.scan(b'{"activePowerMin": 5')
+    assert scanner.scan(b'{"activePowerMin": 3}') is not result
+    assert result == {"activePowerMin": 1, "activePowerAvg": 2}
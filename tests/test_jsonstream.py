@@ -0,0 +1,97 @@
+import json
+
+from solar.jsonstream import encode
+from solar.ringbuf import RingBuffer
+from solar.store import (
+    HUB_PROPERTIES,
+    PACK_PROPERTIES,
+    PackList,
+    PropertyStore,
+    schema,
+)
+
+
+def assert_encodes_like_json(value, expected):
+    assert "".join(encode(value)) == json.dumps(expected)
+
+
+def test_scalars():
+    for value in (None, True, False, 0, -7, 2**40, 0.5, -1e-7, 1e22, 3.14159):
+        assert_encodes_like_json(value, value)
+
+
+def test_strings():
+    for value in ("", "plain", 'quote " backslash \\', "tab\tnew\nline", "€ ☀", "\x00"):
+        assert_encodes_like_json(value, value)
+
+
+def test_containers():
+    value = {"a": [1, 2.5, None], "b": {"c": True, "d": []}, "e": {}, 'k"ey': "v"}
+    assert_encodes_like_json(value, value)
+    assert_encodes_like_json([[], [{}], ["x"]], [[], [{}], ["x"]])
+
+
+def test_property_store():
+    store = PropertyStore(schema(HUB_PROPERTIES))
+    assert_encodes_like_json(store, {})
+    store.update(
+        {
+            "outputLimit": 120,
+            "electricLevel": 87,
+            "masterSoftVersion": 2**40,
+            "pvBrand": None,
+            "solarInputPower": 10.5,
+            "unknown": "text \"'\\",
+            "autoRecover": True,
+        }
+    )
+    # Integer slots in schema order, followed by the other values
+    assert_encodes_like_json(
+        store,
+        {
+            "electricLevel": 87,
+            "outputLimit": 120,
+            "masterSoftVersion": 2**40,
+            "pvBrand": None,
+            "solarInputPower": 10.5,
+            "unknown": "text \"'\\",
+            "autoRecover": True,
+        },
+    )
+
+
+def test_ring_buffer():
+    ring = RingBuffer(3)
+    assert_encodes_like_json(ring, [])
+    ring.extend([{"a": 1}, 2, "three", None, 5.5])
+    assert_encodes_like_json(ring, ["three", None, 5.5])
+
+
+def test_pack_list():
+    packs = PackList(schema(PACK_PROPERTIES))
+    assert_encodes_like_json(packs, [])
+    packs.update([{"sn": "A1", "socLevel": 50, "maxTemp": 2981}, {"sn": "B2"}])
+    packs.update([{"sn": "A1", "socLevel": 51, "state": None}])
+    assert_encodes_like_json(
+        packs,
+        [{"maxTemp": 2981, "socLevel": 51, "sn": "A1", "state": None}, {"sn": "B2"}],
+    )
+
+
+def test_nested_stores():
+    ring = RingBuffer(2)
+    ring.append({"properties": {"outputLimit": 0}})
+    properties = PropertyStore(schema(HUB_PROPERTIES))
+    properties.update({"outputLimit": 30, "minSoc": 100})
+    packs = PackList(schema(PACK_PROPERTIES))
+    packs.update([{"sn": "A1", "power": -12}])
+    data = {"deviceSn": "SN", "data": ring, "properties": properties, "packData": packs}
+    assert_encodes_like_json(
+        data,
+        {
+            "deviceSn": "SN",
+            "data": list(ring),
+            "properties": dict(properties.items()),
+            "packData": [dict(pack.items()) for pack in packs],
+        },
+    )
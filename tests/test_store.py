@@ -0,0 +1,42 @@
+from solar.store import HUB_PROPERTIES, PACK_PROPERTIES, PackList, PropertyStore, schema
+
+
+def test_changed():
+    store = PropertyStore(schema(HUB_PROPERTIES))
+    assert not store.update({})
+    assert store.update({"pvBrand": 1, "outputLimit": 100, "unknown": "a"}, 1)
+    assert not store.update({"pvBrand": 1, "unknown": "a"}, 2)
+    assert store.revision == 1
+    assert dict(store.changed(0)) == {"pvBrand": 1, "outputLimit": 100, "unknown": "a"}
+    assert dict(store.changed(1)) == {}
+    assert store.update({"pvBrand": None, "solarInputPower": 10.5}, 2)
+    assert store.revision == 2
+    assert dict(store.changed(1)) == {"pvBrand": None, "solarInputPower": 10.5}
+    assert store.update({"pvBrand": 2, "unknown": "b"}, 3)
+    assert dict(store.changed(2)) == {"pvBrand": 2, "unknown": "b"}
+    assert dict(store.changed(0)) == {
+        "outputLimit": 100,
+        "pvBrand": 2,
+        "solarInputPower": 10.5,
+        "unknown": "b",
+    }
+
+
+def test_changed_after_clear():
+    store = PropertyStore(schema(HUB_PROPERTIES))
+    store.update({"outputLimit": 100, "autoRecover": True}, 1)
+    store.clear()
+    assert store.revision == 0
+    assert dict(store.changed(-1)) == {}
+    store.update({"outputLimit": 100}, 2)
+    assert dict(store.changed(1)) == {"outputLimit": 100}
+
+
+def test_pack_list_changed():
+    packs = PackList(schema(PACK_PROPERTIES))
+    assert packs.update([{"sn": "A1", "socLevel": 50}, {"sn": "B2", "socLevel": 60}], 1)
+    assert not packs.update([{"sn": "A1", "socLevel": 50}], 2)
+    assert packs.update([{"sn": "B2", "socLevel": 61, "maxTemp": None}], 3)
+    assert [(sn, dict(changed)) for sn, changed in packs.changed(1)] == [
+        ("B2", {"socLevel": 61, "maxTemp": None})
+    ]